@@ -0,0 +1,213 @@
+"""Headless render benchmark.
+
+Renders a fixed number of frames of .spyLAZ scenes or generated scenes on
+SDL's dummy video driver and reports frame times split into update, draw
+and flip. Animation advances by a fixed simulated step and all randomness
+is seeded, so results are comparable across commits.
+
+    python benchmark.py scenes/test.spyLAZ --frames 600
+    python benchmark.py --objects 10 1000 100000 --kind mixed --json results.json
+    python benchmark.py --objects 10000 --transition crossfade
+    python benchmark.py --objects 10000 --outputs 2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+
+import numpy as np
+
+from dmx import DEFAULT_PARAMETERS
+from motion import TRANSITIONS, CompiledScene, morph_frames
+from outputs import Output, OutputGroup
+from render import RENDERERS, Crossfader
+from scenes import load_scene_file
+
+STAGES = ("update", "draw", "flip")
+PERCENTILES = (50, 95, 99)
+
+
+def generate_scene(count, kind="mixed", size=(1920, 1080), path_points=8, palette=16, seed=0):
+    """Generate a scene of circular and/or path objects spread over the screen.
+
+    Colors come from a palette of the given size; 0 gives every object its own color.
+    """
+    rng = random.Random(seed)
+    width, height = size
+    colors = [[rng.randint(0, 255) for _ in range(3)] for _ in range(palette)]
+    objects = []
+    for i in range(count):
+        motion = kind if kind != "mixed" else ("circular" if i % 2 == 0 else "path")
+        obj = {
+            "motion": motion,
+            "color": list(rng.choice(colors)) if colors else [rng.randint(0, 255) for _ in range(3)],
+            "radius": rng.randint(2, 40),
+        }
+        if motion == "circular":
+            obj["path_center"] = [rng.uniform(0, width), rng.uniform(0, height)]
+            obj["path_radius"] = rng.uniform(10, min(width, height) / 3)
+            obj["angular_velocity"] = rng.uniform(-3, 3)
+        else:
+            obj["path"] = [[rng.uniform(0, width), rng.uniform(0, height)] for _ in range(path_points)]
+            obj["speed"] = rng.uniform(0.5, 4)
+            obj["animation"] = rng.choice(["none", "loop", "bounce"])
+        objects.append(obj)
+    return {"name": f"generated {kind} x{count}", "objects": objects}
+
+
+def run_benchmark(scene, frames, screen, renderer, seed=0, parameters=DEFAULT_PARAMETERS, transition="cut",
+                  outputs=None):
+    """Render frames of a scene and return per-stage frame times in seconds.
+
+    With a crossfade or morph transition every frame blends the scene with a
+    second copy at other phases, which is the cost of a scene change in progress.
+    Frames are also published to an OutputGroup if given; that counts as update.
+    """
+    import pygame
+
+    compiled = CompiledScene(scene, log=lambda message: None, seed=seed)
+    outgoing = CompiledScene(scene, log=lambda message: None, seed=seed + 1) if transition != "cut" else None
+    crossfader = Crossfader()
+    center = (screen.get_width() / 2, screen.get_height() / 2)
+    multipliers = parameters.multipliers()
+    times = np.empty((frames, len(STAGES)))
+
+    for frame in range(frames):
+        start = time.perf_counter()
+        evaluated_frame = compiled.evaluate(center, *multipliers)
+        compiled.advance(1 / 60)
+        if outgoing is not None:
+            outgoing_frame = outgoing.evaluate(center, *multipliers)
+            outgoing.advance(1 / 60)
+            if transition == "morph":
+                evaluated_frame = morph_frames(outgoing_frame, evaluated_frame, frame / frames)
+        if outputs is not None:
+            outputs.publish(evaluated_frame, dt=1 / 60, outgoing=outgoing_frame if transition == "crossfade" else None,
+                            amount=frame / frames)
+        evaluated = time.perf_counter()
+        screen.fill((0, 0, 0))
+        if transition == "crossfade":
+            crossfader.draw(screen, renderer, outgoing_frame, evaluated_frame, frame / frames)
+        else:
+            renderer.draw(screen, *evaluated_frame)
+        drawn = time.perf_counter()
+        pygame.display.flip()
+        pygame.event.pump()
+        flipped = time.perf_counter()
+        times[frame] = (evaluated - start, drawn - evaluated, flipped - drawn)
+    return compiled.count, times
+
+
+def summarize(name, count, times):
+    """Return FPS and frame time percentiles in milliseconds."""
+    total = times.sum(axis=1)
+    result = {"scene": name, "objects": count, "frames": len(times), "fps": len(total) / total.sum()}
+    for stage, column in zip(STAGES + ("frame",), list(times.T) + [total]):
+        for p, value in zip(PERCENTILES, np.percentile(column, PERCENTILES)):
+            result[f"{stage}_p{p}_ms"] = value * 1000
+    return result
+
+
+def environment():
+    """Describe the machine and commit the results were measured on."""
+    import pygame
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def print_table(results):
+    header = f"{'scene':<32} {'objects':>8} {'fps':>9}"
+    for stage in STAGES + ("frame",):
+        header += f" {stage + ' p50/p95/p99 ms':>26}"
+    print(header)
+    for result in results:
+        line = f"{result['scene'][:32]:<32} {result['objects']:>8} {result['fps']:>9.1f}"
+        for stage in STAGES + ("frame",):
+            values = "/".join(f"{result[f'{stage}_p{p}_ms']:.2f}" for p in PERCENTILES)
+            line += f" {values:>26}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless render benchmark for spyLAZ scenes.")
+    parser.add_argument("scenes", nargs="*", help=".spyLAZ files to render")
+    parser.add_argument("--objects", type=int, nargs="*", default=[],
+                        help="object counts of generated scenes, e.g. 10 1000 100000")
+    parser.add_argument("--kind", choices=["circular", "path", "mixed"], default="mixed",
+                        help="motion type of generated objects")
+    parser.add_argument("--path-points", type=int, default=8, help="points per generated path")
+    parser.add_argument("--palette", type=int, default=16,
+                        help="colors used by generated objects, 0 for a random color per object")
+    parser.add_argument("--frames", type=int, default=600, help="frames to render per scene")
+    parser.add_argument("--warmup", type=int, default=30, help="frames rendered before measuring")
+    parser.add_argument("--size", default="1920x1080", help="output resolution WIDTHxHEIGHT")
+    parser.add_argument("--renderer", choices=list(RENDERERS), default=next(iter(RENDERERS)),
+                        help="renderer backend")
+    parser.add_argument("--transition", choices=TRANSITIONS, default="cut",
+                        help="render every frame as this scene change in progress")
+    parser.add_argument("--outputs", type=int, default=0,
+                        help="extra output processes to feed, rendering on the same video driver")
+    parser.add_argument("--driver", default="dummy", help="SDL video driver, e.g. dummy or offscreen")
+    parser.add_argument("--seed", type=int, default=0, help="seed for generated scenes and phases")
+    parser.add_argument("--json", help="write results and environment to this file")
+    args = parser.parse_args()
+
+    if not args.scenes and not args.objects:
+        parser.error("give .spyLAZ files and/or --objects counts")
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    # Must be set before pygame initializes the display
+    os.environ["SDL_VIDEODRIVER"] = args.driver
+    import pygame
+
+    pygame.display.init()
+    screen = pygame.display.set_mode((width, height))
+
+    scenes = [load_scene_file(path) for path in args.scenes]
+    scenes += [generate_scene(count, args.kind, (width, height), args.path_points, args.palette, args.seed)
+               for count in args.objects]
+
+    results = []
+    for scene in scenes:
+        # Fresh renderer per scene so caches warm up within the warmup frames only
+        renderer = RENDERERS[args.renderer]()
+        outputs = None
+        if args.outputs:
+            outputs = OutputGroup([Output(f"Output {number + 2}", (0, 0), (width, height), (0, 0), 1.0, False)
+                                   for number in range(args.outputs)],
+                                  args.renderer, capacity=max(len(scene["objects"]), 1), driver=args.driver)
+            outputs.start()
+        run_benchmark(scene, args.warmup, screen, renderer, args.seed, transition=args.transition, outputs=outputs)
+        count, times = run_benchmark(scene, args.frames, screen, renderer, args.seed, transition=args.transition,
+                                     outputs=outputs)
+        if outputs is not None:
+            outputs.stop()
+        result = summarize(scene["name"], count, times)
+        if hasattr(renderer, "stats"):
+            result.update({f"cache_{name}": value for name, value in renderer.stats().items()})
+        results.append(result)
+    pygame.quit()
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"environment": environment(), "settings": vars(args), "results": results}, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
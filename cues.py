@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+# Cue list kept next to the scenes in a scene folder
+CUE_FILE = "cues.json"
+
+# Seconds between checks of the show time for seeks while a cue plays
+CUE_POLL = 0.1
+
+# A scene to show; a hold cue stays until the next GO instead of following after its duration
+Cue = namedtuple("Cue", "scene duration hold")
+
+
+def default_cue_list(scene_names, duration):
+    """Follow every scene after the same duration, in library order."""
+    return [Cue(name, duration, False) for name in scene_names]
+
+
+def load_cue_list(file_path, scene_names):
+    """Read a cue list file and return (cues, loop).
+
+    The file holds {"loop": true, "cues": [{"scene": "Intro", "duration": 8},
+    {"scene": "Chorus", "hold": true}, ...]}. loop is true to repeat forever,
+    false to play once, or a number of passes.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Could not read cue list {file_path}: {e}") from e
+
+    try:
+        loop = data.get("loop", True)
+        if isinstance(loop, bool):
+            loop = True if loop else 1
+        elif not isinstance(loop, int) or loop < 1:
+            raise ValueError("loop must be true, false or a number of passes")
+
+        cues = []
+        for number, entry in enumerate(data["cues"], 1):
+            scene = entry["scene"]
+            if scene not in scene_names:
+                raise ValueError(f"cue {number} uses unknown scene '{scene}'")
+            hold = bool(entry.get("hold", False))
+            duration = float(entry.get("duration", 0))
+            if duration < 0 or (not hold and duration == 0):
+                raise ValueError(f"cue {number} needs a positive duration or hold")
+            cues.append(Cue(scene, duration, hold))
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cue list {file_path}: {e}") from e
+    if not cues:
+        raise ValueError(f"Cue list {file_path} has no cues.")
+    return cues, loop
+
+
+def folder_cue_list(folder, scene_names, duration):
+    """Return (cues, loop) from the folder's cue list, or every scene in order without one."""
+    file_path = os.path.join(folder, CUE_FILE) if folder else None
+    if file_path and os.path.exists(file_path):
+        return load_cue_list(file_path, scene_names)
+    return default_cue_list(scene_names, duration), True
+
+
+class CueScheduler(threading.Thread):
+    """Plays a cue list on a timeline of show time.
+
+    Follow cues end on a fixed timeline, start + sum of durations, so switches
+    do not drift over a long show, and the cue playing is a function of the
+    clock: when show time is sought, e.g. by timecode, playback moves to the
+    cue that covers it. go(), skip() and hold cues start a new timeline from
+    the cue they lead to. The thread polls the clock every CUE_POLL seconds
+    for seeks and wakes early for go(), skip() or stop(). on_cue(number, cue,
+    start) is called from this thread when a cue starts, with the clock time
+    it started at on the timeline.
+    """
+
+    def __init__(self, cues, on_cue, loop=True, clock=time.monotonic):
+        super().__init__(daemon=True)
+        self.cues = list(cues)
+        self.on_cue = on_cue
+        self.loop = loop
+        self.clock = clock
+        self.wake = threading.Event()
+        self.stopped = False
+        self.advance = False
+        self.jump = None  # Cue number to go to, or (cues to move,) from the current one
+        self.position = (0, 0)  # Index of the current cue and passes played
+
+    def go(self, number=None):
+        """End the current cue now and go to the next one, or to cue number; releases hold cues."""
+        self.jump = number
+        self.advance = True
+        self.wake.set()
+
+    def skip(self, count=1):
+        """End the current cue now and move count cues on, or back if negative."""
+        self.jump = (count,)
+        self.advance = True
+        self.wake.set()
+
+    def upcoming(self):
+        """Return the cue that follows the current one unless go() or skip() intervene, or None at the end."""
+        index, passes = self.position
+        if index + 1 < len(self.cues):
+            return self.cues[index + 1]
+        if self.loop is True or passes + 1 < self.loop:
+            return self.cues[0]
+        return None
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+    def locate(self, anchor, now):
+        """Return (index, passes, start) of the cue playing at now on the timeline from anchor, or None after the end.
+
+        anchor is (index, passes, start) of the cue the timeline starts with; earlier times stay on it.
+        """
+        index, passes, start = anchor
+        while True:
+            cue = self.cues[index]
+            if cue.hold or now < start + cue.duration:
+                return index, passes, start
+            start += cue.duration
+            index += 1
+            if index == len(self.cues):
+                index, passes = 0, passes + 1
+                if self.loop is not True and passes >= self.loop:
+                    return None
+
+    def run(self):
+        anchor = (0, 0, self.clock())
+        playing = None
+        while not self.stopped:
+            now = self.clock()
+            position = self.locate(anchor, now)
+            if position is None:
+                return
+            index, passes, start = position
+            cue = self.cues[index]
+            if position != playing:
+                playing = position
+                self.position = (index, passes)
+                self.on_cue(index + 1, cue, start)
+            timeout = CUE_POLL if cue.hold else min(start + cue.duration - now, CUE_POLL)
+            if not self.wait(timeout):
+                continue
+
+            # Ended by go() or skip()
+            jump, self.jump = self.jump, None
+            if jump is None:
+                index += 1
+            elif isinstance(jump, tuple) and self.loop is True:
+                index = (index + jump[0]) % len(self.cues)
+            elif isinstance(jump, tuple):
+                # Skipping past the end finishes the pass, so a list played once or N times still ends
+                index = min(max(index + jump[0], 0), len(self.cues))
+            else:
+                index = min(max(jump, 1), len(self.cues)) - 1
+            if index == len(self.cues):
+                index, passes = 0, passes + 1
+                if self.loop is not True and passes >= self.loop:
+                    return
+            anchor = (index, passes, self.clock())
+            playing = None  # Start the cue again even if go() led back to it
+
+    def wait(self, timeout):
+        """Sleep up to timeout seconds; return True if go() or skip() ended it early."""
+        if self.wake.wait(max(timeout, 0.0)):
+            self.wake.clear()
+            if self.advance:
+                self.advance = False
+                return True
+        return False
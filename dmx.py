@@ -0,0 +1,492 @@
+import asyncio
+import socket
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+# Trail half-life range of the trail channel, in seconds
+MIN_TRAIL = 0.02
+MAX_TRAIL = 4.0
+
+
+class DmxParameters(namedtuple("DmxParameters", "brightness speed radius shift_x shift_y scale trail stats")):
+    """Raw 0-255 values of the eight spyLaz channels."""
+    __slots__ = ()
+
+    def multipliers(self):
+        """Convert the channel values to the factors used by the renderer."""
+        return (
+            self.brightness / 255.0,
+            (self.speed / 128.0) ** 2,
+            (self.radius / 128.0) ** 2,
+            (self.shift_x - 128.0, self.shift_y - 128.0),
+            self.scale / 128.0,
+        )
+
+    def trail_half_life(self):
+        """Return the trail half-life in seconds, or None at 0 to leave it to the scene."""
+        if not self.trail:
+            return None
+        return MIN_TRAIL * (MAX_TRAIL / MIN_TRAIL) ** ((self.trail - 1) / 254.0)
+
+    def show_stats(self):
+        """Return True if the stats channel asks for the frame stats overlay."""
+        return self.stats >= 128
+
+
+DEFAULT_PARAMETERS = DmxParameters(255, 128, 128, 128, 128, 128, 0, 0)
+
+
+class Arrival(namedtuple("Arrival", "time source")):
+    """perf_counter() time a DMX frame was received and the source that sent it."""
+    __slots__ = ()
+
+
+class ParameterStore:
+    """Latest parameter snapshot shared between the DMX input, Tk and the renderer.
+
+    Snapshots are immutable tuples and writers replace the reference in one
+    assignment, so readers always see a complete frame without taking a lock.
+    stamped pairs the snapshot with the Arrival of the DMX frame it came from,
+    or None for changes made by hand.
+    """
+
+    def __init__(self, parameters=DEFAULT_PARAMETERS):
+        self.publish(parameters)
+
+    def publish(self, parameters, arrival=None):
+        """Swap in a complete new snapshot."""
+        self.stamped = (parameters, arrival)
+        self.current = parameters
+
+    def update(self, **changes):
+        """Swap in a copy of the current snapshot with some channels changed."""
+        self.publish(self.current._replace(**changes))
+
+
+# Art-Net listens on one UDP port for every universe
+ARTNET_PORT = 6454
+ARTNET_HEADER = b"Art-Net\0"
+OP_DMX = b"\x00\x50"  # OpDmx, little-endian 0x5000
+OP_TIMECODE = b"\x00\x97"  # OpTimeCode, 0x9700
+
+# Frame rates of the Art-Net timecode types: film, EBU, drop-frame and SMPTE
+TIMECODE_RATES = {0: 24, 1: 25, 2: 30000 / 1001, 3: 30}
+DROP_FRAME = 2
+
+# sACN (E1.31) data packets, multicast per universe
+SACN_PORT = 5568
+SACN_IDENTIFIER = b"ASC-E1.17\0\0\0"
+VECTOR_ROOT_E131_DATA = b"\x00\x00\x00\x04"
+VECTOR_E131_DATA_PACKET = b"\x00\x00\x00\x02"
+OPTION_PREVIEW = 0x80
+OPTION_TERMINATED = 0x40
+LOWEST_PRIORITY = 1
+
+# Merging: Art-Net has no priority field, so it competes at the sACN default
+DEFAULT_PRIORITY = 100
+ARTNET_PRIORITY = DEFAULT_PRIORITY
+SOURCE_TIMEOUT = 2.5  # E1.31 network data loss timeout in seconds
+MERGE_MODES = ("htp", "ltp")
+UNIVERSE_SIZE = 512
+
+# Datagrams read per socket wakeup before merging, so a flood cannot starve the timeout sweep
+DRAIN_LIMIT = 64
+UDP_BUFFER = 1024  # Larger than any ArtDMX or sACN data packet
+
+# Channels used by one spyLaz fixture, see spyLazV1.qxf
+FIXTURE_CHANNELS = 8
+# Channels of the original six-channel profile; frames may end after them
+REQUIRED_CHANNELS = 6
+
+
+class FixturePatch(namedtuple("FixturePatch", "universe address parameters")):
+    """A virtual spyLaz fixture: Art-Net universe, 1-based start address and its ParameterStore.
+
+    Universes use Art-Net numbering; sACN universe 1 is universe 0 here, as consoles count them.
+    """
+    __slots__ = ()
+
+
+def parse_artdmx(data):
+    """Return (universe, dmx_data) for an ArtDMX packet, or None for anything else."""
+    if len(data) < 18 or data[:8] != ARTNET_HEADER or data[8:10] != OP_DMX:
+        return None
+    universe = data[14] | (data[15] << 8)  # SubUni and Net form the 15-bit port-address
+    length = (data[16] << 8) | data[17]
+    return universe, data[18:18 + length]
+
+
+def parse_timecode(data):
+    """Return the time of an ArtTimeCode packet in seconds, or None for anything else."""
+    if len(data) < 19 or data[:8] != ARTNET_HEADER or data[8:10] != OP_TIMECODE:
+        return None
+    frames, seconds, minutes, hours, kind = data[14:19]
+    if kind not in TIMECODE_RATES:
+        return None
+    if kind == DROP_FRAME:
+        # Frame labels 0 and 1 are skipped every minute except every tenth, so count the real frames
+        total_minutes = 60 * hours + minutes
+        number = (3600 * hours + 60 * minutes + seconds) * 30 + frames - 2 * (total_minutes - total_minutes // 10)
+        return number / TIMECODE_RATES[kind]
+    return 3600 * hours + 60 * minutes + seconds + frames / TIMECODE_RATES[kind]
+
+
+def timecode_packet(show_time, kind=1):
+    """Build an ArtTimeCode packet for a non-drop-frame time in seconds, e.g. to stand in for a console."""
+    rate = TIMECODE_RATES[kind]
+    frames = int(round(show_time * rate))
+    seconds, frames = divmod(frames, round(rate))
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return ARTNET_HEADER + OP_TIMECODE + b"\x00\x0e\x00\x00" + bytes([frames, seconds, minutes, hours % 24, kind])
+
+
+def artdmx_packet(universe, dmx_data, sequence=0):
+    """Build an ArtDMX packet, e.g. to stand in for a console."""
+    return (ARTNET_HEADER + OP_DMX + b"\x00\x0e" + bytes([sequence, 0, universe & 0xFF, universe >> 8])
+            + len(dmx_data).to_bytes(2, "big") + bytes(dmx_data))
+
+
+class SacnFrame(namedtuple("SacnFrame", "cid priority sequence options universe start_code data")):
+    """Fields of an E1.31 data packet used for merging."""
+    __slots__ = ()
+
+
+def parse_sacn(data):
+    """Return a SacnFrame for an E1.31 data packet, or None for anything else."""
+    if (len(data) < 126 or data[4:16] != SACN_IDENTIFIER or data[18:22] != VECTOR_ROOT_E131_DATA
+            or data[40:44] != VECTOR_E131_DATA_PACKET or data[117] != 0x02):
+        return None
+    count = int.from_bytes(data[123:125], "big")  # Start code plus slots
+    return SacnFrame(bytes(data[22:38]), data[108], data[111], data[112],
+                     int.from_bytes(data[113:115], "big"), data[125], bytes(data[126:125 + count]))
+
+
+def sacn_packet(universe, dmx_data, cid, priority=DEFAULT_PRIORITY, sequence=0, options=0, source_name=""):
+    """Build an E1.31 data packet, e.g. to stand in for a console."""
+    dmp = b"\x02\xa1\x00\x00\x00\x01" + (len(dmx_data) + 1).to_bytes(2, "big") + b"\x00" + bytes(dmx_data)
+    framing = (VECTOR_E131_DATA_PACKET + source_name.encode("utf-8")[:63].ljust(64, b"\0")
+               + bytes([priority, 0, 0, sequence, options]) + universe.to_bytes(2, "big"))
+    root = VECTOR_ROOT_E131_DATA + bytes(cid).ljust(16, b"\0")[:16]
+
+    def pdu(body):
+        return (0x7000 | (len(body) + 2)).to_bytes(2, "big") + body
+
+    return b"\x00\x10\x00\x00" + SACN_IDENTIFIER + pdu(root + pdu(framing + pdu(dmp)))
+
+
+def sacn_multicast_group(universe):
+    """Return the multicast address an sACN universe is sent to."""
+    return f"239.255.{universe >> 8}.{universe & 0xFF}"
+
+
+def fixture_parameters(dmx_data, address, current=DEFAULT_PARAMETERS):
+    """Return the DmxParameters of a fixture at a 1-based address, or None if the frame is too short.
+
+    Frames sent for the six-channel profile end before Trail and Stats; those keep their current values.
+    """
+    values = tuple(dmx_data[address - 1:address - 1 + FIXTURE_CHANNELS])
+    if len(values) < REQUIRED_CHANNELS:
+        return None
+    return DmxParameters(*values, *current[len(values):])
+
+
+class DmxSource:
+    """Latest frame of one sender on one universe."""
+    __slots__ = ("data", "length", "priority", "received")
+
+    def __init__(self, data, length, priority, received):
+        self.data = data
+        self.length = length
+        self.priority = priority
+        self.received = received
+
+
+class DmxMerger:
+    """Merges frames from several senders and protocols per universe.
+
+    Only the sources with the highest priority take part; among them the
+    highest value per channel wins (HTP) or the most recent frame wins (LTP).
+    Sources that stop sending drop out after the E1.31 data loss timeout.
+    """
+
+    def __init__(self, mode="htp", timeout=SOURCE_TIMEOUT):
+        self.mode = mode
+        self.timeout = timeout
+        self.universes = {}
+
+    def receive(self, universe, source, dmx_data, priority=DEFAULT_PRIORITY, now=None):
+        """Store the newest frame of a source, reusing its buffer from the last frame."""
+        length = min(len(dmx_data), UNIVERSE_SIZE)
+        received = time.monotonic() if now is None else now
+        sources = self.universes.setdefault(universe, {})
+        entry = sources.get(source)
+        if entry is None:
+            entry = sources[source] = DmxSource(np.zeros(UNIVERSE_SIZE, dtype=np.uint8), 0, priority, received)
+        entry.data[:length] = np.frombuffer(dmx_data, dtype=np.uint8, count=length)
+        if length < entry.length:
+            entry.data[length:entry.length] = 0  # A shorter frame must not leave old channels in an HTP merge
+        entry.length = length
+        entry.priority = priority
+        entry.received = received
+
+    def remove(self, universe, source):
+        """Forget a source, e.g. when it terminates its stream."""
+        self.universes.get(universe, {}).pop(source, None)
+
+    def expire(self, now=None):
+        """Drop sources that timed out and return the universes that changed."""
+        now = time.monotonic() if now is None else now
+        changed = set()
+        for universe, sources in self.universes.items():
+            for source in [key for key, entry in sources.items() if now - entry.received > self.timeout]:
+                del sources[source]
+                changed.add(universe)
+        return changed
+
+    def merge(self, universe):
+        """Return the merged channels of a universe, or None without live sources."""
+        sources = list(self.universes.get(universe, {}).values())
+        if not sources:
+            return None
+        priority = max(entry.priority for entry in sources)
+        sources = [entry for entry in sources if entry.priority == priority]
+        if len(sources) == 1 or self.mode == "ltp":
+            latest = max(sources, key=lambda entry: entry.received)
+            return latest.data[:latest.length].tobytes()
+        length = max(entry.length for entry in sources)
+        return np.maximum.reduce([entry.data for entry in sources])[:length].tobytes()
+
+
+class _ArtNetProtocol:
+    def __init__(self, dmx_input):
+        self.dmx_input = dmx_input
+
+    def datagram_received(self, data, addr, received):
+        packet = parse_artdmx(data)
+        if packet:
+            self.dmx_input.receive(packet[0], ("artnet", addr[0]), packet[1], ARTNET_PRIORITY, received)
+            return
+        show_time = parse_timecode(data)
+        if show_time is not None and self.dmx_input.on_timecode is not None:
+            self.dmx_input.on_timecode(show_time, received)
+
+
+class _SacnProtocol:
+    def __init__(self, dmx_input):
+        self.dmx_input = dmx_input
+        self.sequences = {}
+
+    def datagram_received(self, data, addr, received):
+        frame = parse_sacn(data)
+        if frame is None or frame.start_code != 0 or frame.options & OPTION_PREVIEW:
+            return
+        source = ("sacn", frame.cid)
+        universe = frame.universe - 1  # sACN counts universes from 1, Art-Net from 0
+        if frame.options & OPTION_TERMINATED:
+            self.sequences.pop((frame.cid, frame.universe), None)
+            self.dmx_input.terminate(universe, source)
+            return
+
+        # Discard late packets as E1.31 asks: up to 20 behind the last sequence number
+        last = self.sequences.get((frame.cid, frame.universe))
+        if last is not None and -20 < ((frame.sequence - last + 128) % 256) - 128 <= 0:
+            return
+        self.sequences[(frame.cid, frame.universe)] = frame.sequence
+        self.dmx_input.receive(universe, source, frame.data, frame.priority, received)
+
+
+class DmxInput(threading.Thread):
+    """One asyncio event loop receiving Art-Net and sACN for all patched fixtures.
+
+    Each wakeup drains every datagram waiting on a socket before merging, so a
+    burst from several consoles costs one merge per universe. Frames are
+    merged per universe and the merged values are published to the
+    ParameterStore of every fixture patched on that universe, stamped with the
+    Arrival of the earliest frame merged into them. Art-Net timecode is passed
+    to on_timecode(seconds, received) with its perf_counter() arrival time.
+    """
+
+    def __init__(self, patch=(), merge_mode="htp", artnet=True, sacn=True, bind_address="0.0.0.0",
+                 artnet_port=ARTNET_PORT, sacn_port=SACN_PORT, log=print, on_timecode=None):
+        super().__init__(daemon=True)
+        self.on_timecode = on_timecode
+        self.patch = tuple(patch)
+        self.merger = DmxMerger(merge_mode)
+        self.artnet = artnet
+        self.sacn = sacn
+        self.bind_address = bind_address
+        self.artnet_port = artnet_port
+        self.sacn_port = sacn_port
+        self.log = log
+        self.running = True
+        self.ready = threading.Event()
+        self.loop = None
+        self._stopped = None
+        self._sacn_socket = None
+        self._joined = set()
+        self._dirty = {}
+
+    def set_patch(self, fixtures):
+        """Replace the patched fixtures; takes effect with the next packet."""
+        self.patch = tuple(fixtures)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._join_groups)
+
+    def set_merge_mode(self, mode):
+        """Switch between HTP and LTP merging."""
+        if mode not in MERGE_MODES:
+            raise ValueError(f"unknown merge mode '{mode}'")
+        self.merger.mode = mode
+
+    def run(self):
+        # Selector loop on every platform: the sockets are drained with add_reader()
+        loop = asyncio.SelectorEventLoop()
+        try:
+            loop.run_until_complete(self._serve())
+        finally:
+            loop.close()
+
+    def stop(self):
+        self.running = False
+        if self.loop is not None and self._stopped is not None:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        sockets = []
+        try:
+            if self.artnet:
+                sockets.append(self._listen(self.artnet_port, _ArtNetProtocol(self)))
+            if self.sacn:
+                self._sacn_socket = self._listen(self.sacn_port, _SacnProtocol(self), reuse=True)
+                sockets.append(self._sacn_socket)
+                self._join_groups()
+        except OSError as e:
+            self.log(f"DMX input error: {e}")
+        finally:
+            self.ready.set()
+
+        # Sweep timed-out sources until stopped
+        while self.running:
+            try:
+                await asyncio.wait_for(self._stopped.wait(), 1.0)
+            except asyncio.TimeoutError:
+                for universe in self.merger.expire():
+                    self._schedule(universe)
+                self._apply()
+
+        for sock in sockets:
+            self.loop.remove_reader(sock)
+            sock.close()
+
+    def _listen(self, port, protocol, reuse=False):
+        """Bind a non-blocking UDP socket and drain it into the protocol whenever it is readable."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            if reuse:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.bind_address, port))
+            sock.setblocking(False)
+            self.loop.add_reader(sock, self._drain, sock, protocol)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _drain(self, sock, protocol):
+        """Read every datagram already queued on a socket, then merge once."""
+        for _ in range(DRAIN_LIMIT):
+            try:
+                data, addr = sock.recvfrom(UDP_BUFFER)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                self.log(f"DMX input error: {e}")
+                break
+            protocol.datagram_received(data, addr, time.perf_counter())
+        self._apply()
+
+    def _join_groups(self):
+        """Join the sACN multicast group of every patched universe."""
+        if self._sacn_socket is None:
+            return
+        for universe in {fixture.universe for fixture in self.patch} - self._joined:
+            if not 1 <= universe + 1 <= 63999:
+                continue
+            membership = socket.inet_aton(sacn_multicast_group(universe + 1)) + socket.inet_aton("0.0.0.0")
+            try:
+                self._sacn_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+                self._joined.add(universe)
+            except OSError as e:
+                self.log(f"sACN could not join universe {universe}: {e}")
+
+    def receive(self, universe, source, dmx_data, priority=DEFAULT_PRIORITY, received=None):
+        """Store a frame; merging runs once the waiting datagrams are drained."""
+        self.merger.receive(universe, source, dmx_data, priority)
+        self._schedule(universe, Arrival(time.perf_counter() if received is None else received, source))
+
+    def terminate(self, universe, source):
+        """Remove a source that ended its stream."""
+        self.merger.remove(universe, source)
+        self._schedule(universe)
+
+    def _schedule(self, universe, arrival=None):
+        if self._dirty.get(universe) is None:
+            self._dirty[universe] = arrival
+
+    def _apply(self):
+        dirty, self._dirty = self._dirty, {}
+        for universe, arrival in dirty.items():
+            merged = self.merger.merge(universe)
+            if merged is None:
+                continue  # Keep the last look when every source is gone
+            for fixture in self.patch:
+                if fixture.universe != universe:
+                    continue
+                parameters = fixture_parameters(merged, fixture.address, fixture.parameters.current)
+                if parameters is not None:
+                    fixture.parameters.publish(parameters, arrival)
+
+
+class DmxTestSender(threading.Thread):
+    """Sends the current parameters of a fixture to the local sACN input at a fixed rate.
+
+    Frames go out at the lowest sACN priority, so with a console sending the
+    same universe they are received and stamped but never change the look.
+    Alone, they repeat the current settings. Either way every frame is a
+    receive-to-flip latency sample.
+    """
+
+    def __init__(self, fixture, rate=40, host="127.0.0.1", port=SACN_PORT, cid=b"spyLaz latency"):
+        super().__init__(daemon=True)
+        self.fixture = fixture
+        self.interval = 1.0 / rate
+        self.target = (host, port)
+        self.cid = cid
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        data = bytearray(self.fixture.address - 1 + FIXTURE_CHANNELS)
+        sequence = 0
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            while True:
+                stopped = self.stopped.wait(self.interval)
+                data[self.fixture.address - 1:] = bytes(round(value) for value in self.fixture.parameters.current)
+                sequence = (sequence + 1) % 256
+                packet = sacn_packet(self.fixture.universe + 1, data, self.cid, LOWEST_PRIORITY, sequence,
+                                     OPTION_TERMINATED if stopped else 0, "spyLaz latency test")
+                try:
+                    sender.sendto(packet, self.target)
+                except OSError:
+                    pass  # Input not listening yet; keep trying
+                if stopped:
+                    return
@@ -0,0 +1,327 @@
+"""Offline render of scenes and cue lists to PNG sequences or raw video.
+
+Renders without a monitor (SDL dummy driver) at any resolution and frame
+rate, faster than real time: positions are a function of scene time, so
+the frame range is split over a pool of processes that each render their
+own part. Laser settings are fixed or follow a recorded curve.
+
+    python export.py scenes/test.spyLAZ --duration 30 --out preview
+    python export.py scenes --cues --size 3840x2160 --fps 50 --format raw --out show.rgb
+    python export.py scenes/test.spyLAZ --duration 30 --set speed=160 --automation dimmer.csv --out preview
+"""
+import argparse
+import bisect
+import csv
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from cues import folder_cue_list
+from dmx import DEFAULT_PARAMETERS, DmxParameters
+from motion import TRANSITIONS, CompiledScene, morph_frames
+from render import RENDERERS, FrameComposer
+from scenes import load_scene_file, load_scene_folder
+
+FORMATS = ("png", "raw")
+
+# Trail half-lives rendered before a frame range, after which a trail has faded away completely,
+# so a range starts with the same trails it would have in one continuous render
+TRAIL_PREROLL = 9
+
+
+class Timeline:
+    """Scenes played one after another, each from its own scene time 0.
+
+    entries are (scene, seconds). Scene changes use the transition, (mode,
+    seconds), like the live projection does. A scene shown more than once
+    is compiled once.
+    """
+
+    def __init__(self, entries, transition=("cut", 0.0)):
+        compiled = {}
+        self.compiled = [compiled.setdefault(id(scene), CompiledScene(scene, log=lambda message: None))
+                         for scene, _ in entries]
+        self.starts = [0.0]
+        for _, seconds in entries:
+            self.starts.append(self.starts[-1] + seconds)
+        self.duration = self.starts.pop()
+        self.transition = transition
+
+    def preroll(self, automation, fps):
+        """Return the frames to render before a range for the longest trail to build up."""
+        half_lives = [compiled.trail for compiled in self.compiled] + [automation.longest_trail() or 0.0]
+        return math.ceil(TRAIL_PREROLL * max(half_lives) * fps)
+
+    def at(self, t):
+        """Return (index, scene time, outgoing index, its scene time, fade amount) at time t.
+
+        The outgoing index is None outside a transition.
+        """
+        index = max(bisect.bisect_right(self.starts, t) - 1, 0)
+        elapsed = t - self.starts[index]
+        mode, fade = self.transition
+        if index and mode != "cut" and fade > 0 and elapsed < fade:
+            return index, elapsed, index - 1, t - self.starts[index - 1], elapsed / fade
+        return index, elapsed, None, 0.0, 1.0
+
+
+class Automation:
+    """Laser settings over time: fixed values, some channels following recorded curves.
+
+    curves maps channel names as in DmxParameters to values at times, which
+    are interpolated linearly and held before the first and after the last.
+    """
+
+    def __init__(self, parameters=DEFAULT_PARAMETERS, times=(), curves=None):
+        self.parameters = parameters
+        self.times = np.asarray(times, dtype=np.float64)
+        self.curves = {name: np.asarray(values, dtype=np.float64) for name, values in (curves or {}).items()}
+
+    def at(self, t):
+        """Return the DmxParameters at time t."""
+        if not self.curves:
+            return self.parameters
+        return self.parameters._replace(**{name: int(round(float(np.interp(t, self.times, values))))
+                                           for name, values in self.curves.items()})
+
+    def longest_trail(self):
+        """Return the longest trail half-life the settings ever ask for, or None."""
+        trail = self.curves["trail"].max() if "trail" in self.curves else self.parameters.trail
+        return self.parameters._replace(trail=int(round(trail))).trail_half_life()
+
+
+def load_automation(file_path):
+    """Read recorded laser settings and return (times, curves) for an Automation.
+
+    The CSV file has a "time" column in seconds, increasing, and a column of
+    0-255 values per recorded channel, e.g. time,brightness,speed.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+    except OSError as e:
+        raise ValueError(f"Could not read automation {file_path}: {e}") from e
+
+    try:
+        if not rows:
+            raise ValueError("no rows")
+        channels = [name for name in rows[0] if name != "time"]
+        unknown = set(channels) - set(DmxParameters._fields)
+        if "time" not in rows[0] or unknown:
+            raise ValueError("needs a time column and channel columns named "
+                             + ", ".join(DmxParameters._fields))
+        times = [float(row["time"]) for row in rows]
+        if any(later < earlier for earlier, later in zip(times, times[1:])):
+            raise ValueError("times must increase")
+        curves = {}
+        for name in channels:
+            values = [float(row[name]) for row in rows]
+            if not all(0 <= value <= 255 for value in values):
+                raise ValueError(f"{name} values must be 0-255")
+            curves[name] = values
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid automation {file_path}: {e}") from e
+    return times, curves
+
+
+class Exporter:
+    """Renders frames of a timeline and writes them as PNG files or into a raw RGB24 file.
+
+    Frame n shows time n / fps; a raw file starts with frame origin. Each
+    process of an export has its own Exporter and renders whole frame
+    ranges with it.
+    """
+
+    def __init__(self, timeline, automation, size, fps, renderer_name, output_format, out, origin=0):
+        import pygame
+
+        self.pygame = pygame
+        self.timeline = timeline
+        self.automation = automation
+        self.size = size
+        self.fps = fps
+        self.renderer = RENDERERS[renderer_name]()
+        self.output_format = output_format
+        self.out = out
+        self.origin = origin
+        self.screen = pygame.display.set_mode(size)
+        self.center = (size[0] / 2, size[1] / 2)
+        self.preroll = timeline.preroll(automation, fps)
+
+    def render_range(self, first, last):
+        """Render and write frames first to last - 1; returns how many were written."""
+        composer = FrameComposer(self.renderer)
+        raw = open(self.out, "r+b") if self.output_format == "raw" else None
+        try:
+            for number in range(max(0, first - self.preroll), last):
+                self.draw(composer, number / self.fps)
+                if number < first:
+                    continue
+                if raw is not None:
+                    raw.seek((number - self.origin) * self.size[0] * self.size[1] * 3)
+                    raw.write(self.pygame.image.tobytes(self.screen, "RGB"))
+                else:
+                    self.pygame.image.save(self.screen, os.path.join(self.out, f"frame_{number:06d}.png"))
+        finally:
+            if raw is not None:
+                raw.close()
+        return last - first
+
+    def draw(self, composer, t):
+        """Draw the timeline at time t as the render loop would."""
+        index, elapsed, outgoing_index, outgoing_elapsed, amount = self.timeline.at(t)
+        parameters = self.automation.at(t)
+        multipliers = parameters.multipliers()
+        compiled = self.timeline.compiled[index]
+
+        outgoing_frame = None
+        if outgoing_index is not None:
+            # Evaluated first, a scene following itself is the same CompiledScene
+            outgoing = self.timeline.compiled[outgoing_index]
+            outgoing.seek(outgoing_elapsed)
+            outgoing_frame = outgoing.evaluate(self.center, *multipliers)
+        compiled.seek(elapsed)
+        frame = compiled.evaluate(self.center, *multipliers)
+        trailing = compiled.trailing
+        if outgoing_frame is not None:
+            trailing = None
+            if self.timeline.transition[0] == "morph":
+                frame, outgoing_frame = morph_frames(outgoing_frame, frame, amount), None
+
+        self.screen.fill((0, 0, 0))
+        trail = parameters.trail_half_life() or compiled.trail
+        composer.draw(self.screen, frame, trailing, 1 / self.fps, trail, outgoing_frame, amount)
+
+
+_exporter = None
+
+
+def start_worker(driver, *settings):
+    """Create the Exporter of a pool process."""
+    global _exporter
+    os.environ["SDL_VIDEODRIVER"] = driver
+    import pygame
+
+    pygame.display.init()
+    _exporter = Exporter(*settings)
+
+
+def render_range(frame_range):
+    return _exporter.render_range(*frame_range)
+
+
+def frame_ranges(first, last, jobs, preroll):
+    """Split frames into a few ranges per process, each long enough to be worth its preroll."""
+    size = max(math.ceil((last - first) / (jobs * 4)), preroll, 1)
+    return [(start, min(start + size, last)) for start in range(first, last, size)]
+
+
+def load_timeline(args):
+    """Return the Timeline of the scene files, folder or cue list given on the command line."""
+    transition = (args.transition, args.fade)
+    if len(args.scenes) == 1 and os.path.isdir(args.scenes[0]):
+        scenes, errors, _ = load_scene_folder(args.scenes[0])
+        for message in errors:
+            print(message, file=sys.stderr)
+        if args.cues:
+            cues, _ = folder_cue_list(args.scenes[0], scenes, args.duration)
+            return Timeline([(scenes[cue.scene], args.hold if cue.hold else cue.duration) for cue in cues],
+                            transition)
+        scenes = [scenes[name] for name in sorted(scenes)]
+    elif args.cues:
+        raise ValueError("--cues needs a scene folder")
+    else:
+        scenes = [load_scene_file(path) for path in args.scenes]
+    return Timeline([(scene, args.duration) for scene in scenes], transition)
+
+
+def load_parameters(args):
+    """Return the Automation of the --set and --automation options."""
+    changes = {}
+    for setting in args.set:
+        name, _, value = setting.partition("=")
+        if name not in DmxParameters._fields or not value.isdigit() or int(value) > 255:
+            raise ValueError(f"Invalid setting '{setting}', use CHANNEL=0-255 with a channel of "
+                             + ", ".join(DmxParameters._fields))
+        changes[name] = int(value)
+    parameters = DEFAULT_PARAMETERS._replace(**changes)
+    if args.automation:
+        return Automation(parameters, *load_automation(args.automation))
+    return Automation(parameters)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render spyLAZ scenes or a cue list to image files or raw video.")
+    parser.add_argument("scenes", nargs="+", help=".spyLAZ files, or a scene folder, played in order")
+    parser.add_argument("--out", required=True, help="folder for PNG frames, or file for raw video")
+    parser.add_argument("--format", choices=FORMATS, default="png",
+                        help="PNG sequence, or raw RGB24 frames for e.g. ffmpeg -f rawvideo -pix_fmt rgb24")
+    parser.add_argument("--cues", action="store_true", help="play the folder's cue list instead of every scene")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds per scene, and per cue of a folder without a cue list")
+    parser.add_argument("--hold", type=float, default=10.0, help="seconds a hold cue is shown")
+    parser.add_argument("--transition", choices=TRANSITIONS, default="cut", help="scene change transition")
+    parser.add_argument("--fade", type=float, default=1.0, help="transition seconds")
+    parser.add_argument("--size", default="1920x1080", help="output resolution WIDTHxHEIGHT")
+    parser.add_argument("--fps", type=float, default=60.0, help="frames per second of show time")
+    parser.add_argument("--start", type=float, default=0.0, help="first second to export")
+    parser.add_argument("--end", type=float, help="second to stop at, the end of the timeline by default")
+    parser.add_argument("--renderer", choices=list(RENDERERS), default=next(iter(RENDERERS)),
+                        help="renderer backend")
+    parser.add_argument("--set", action="append", default=[], metavar="CHANNEL=VALUE",
+                        help="fixed DMX value of a laser setting, e.g. brightness=200")
+    parser.add_argument("--automation", help="CSV of laser settings over time, overriding --set")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="render processes")
+    parser.add_argument("--driver", default="dummy", help="SDL video driver, e.g. dummy or offscreen")
+    args = parser.parse_args()
+
+    try:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        if width <= 0 or height <= 0 or args.fps <= 0 or args.duration <= 0 or args.hold <= 0 or args.jobs < 1:
+            raise ValueError("size, fps, durations and jobs must be positive")
+        timeline = load_timeline(args)
+        automation = load_parameters(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    end = timeline.duration if args.end is None else min(args.end, timeline.duration)
+    first, last = round(args.start * args.fps), round(end * args.fps)
+    if last <= first:
+        parser.error("nothing to export between --start and --end")
+
+    if args.format == "raw":
+        # Every process writes its frames at their place in the file
+        with open(args.out, "wb") as file:
+            file.truncate((last - first) * width * height * 3)
+    else:
+        os.makedirs(args.out, exist_ok=True)
+
+    settings = (args.driver, timeline, automation, (width, height), args.fps, args.renderer, args.format, args.out,
+                first)
+    ranges = frame_ranges(first, last, args.jobs, timeline.preroll(automation, args.fps))
+    started = time.perf_counter()
+    done = 0
+    if args.jobs == 1:
+        start_worker(*settings)
+        results = map(render_range, ranges)
+    else:
+        pool = multiprocessing.get_context("spawn").Pool(args.jobs, start_worker, settings)
+        results = pool.imap_unordered(render_range, ranges)
+    for count in results:
+        done += count
+        print(f"\r{done}/{last - first} frames", end="", file=sys.stderr, flush=True)
+    if args.jobs > 1:
+        pool.close()
+        pool.join()
+
+    seconds = time.perf_counter() - started
+    print(f"\rExported {done} frames in {seconds:.1f} s ({done / seconds:.1f} FPS, "
+          f"{done / args.fps / seconds:.1f}x real time) to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Export of scenes as laser figures in ILDA files.
+
+Every object is drawn as a circle of its radius around its position, and
+with --paths its motion path too: the circle it travels or its polyline.
+A scanner can only draw so many points per second, so each frame gets a
+point budget of pps / fps. Figures are ordered into a tour that keeps the
+blanked galvo travel between them short, lit points are spread more thinly
+when a frame would not fit, and figures are dropped from the end of the
+tour only when even that is not enough.
+
+    python ilda.py scenes/test.spyLAZ --duration 10 --fps 30 --out test.ild
+    python ilda.py scenes/test.spyLAZ --pps 20000 --paths --out test.ild
+"""
+import argparse
+import math
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+from motion import CompiledScene
+from scenes import load_scene_file
+
+# ILDA coordinates run from -32768 to 32767, y pointing up
+ILDA_MAX = 32767
+HEADER = struct.Struct(">4s3xB8s8sHHHBx")  # "ILDA", format, frame name, company, records, number, total, projector
+TRUE_COLOR_2D = 5
+RECORD = np.dtype([("x", ">i2"), ("y", ">i2"), ("status", "u1"), ("b", "u1"), ("g", "u1"), ("r", "u1")])
+LAST_POINT = 0x80
+BLANKED = 0x40
+
+# Largest distance between lit points, in ILDA units; points are spread further apart to fit the budget
+DRAW_STEP = 800
+
+# Largest jump of the galvos between blanked points while travelling to the next figure
+BLANK_STEP = 2500
+
+# Points held where the beam turns on or off, so it does not smear into the travel
+DWELL = 3
+
+# Points held at polyline corners sharper than CORNER_ANGLE degrees, so the galvos turn the corner
+CORNER_DWELL = 2
+CORNER_ANGLE = 30
+
+# Fewest points a circle is drawn with
+MIN_CIRCLE_POINTS = 8
+
+# Figures per frame up to which the nearest-neighbour tour is improved by 2-opt
+TWO_OPT_LIMIT = 300
+
+
+class Figure(namedtuple("Figure", "color center radius points", defaults=(None,))):
+    """A circle (center, radius) or, with points, a polyline, in ILDA units."""
+    __slots__ = ()
+
+    def lit_points(self, step):
+        """Return how many lit points drawing the figure takes at a step, without dwell."""
+        if self.points is not None:
+            return int(np.maximum(1, np.ceil(np.hypot(*np.diff(self.points, axis=0).T) / step)).sum()) + 1
+        if self.radius <= 0:
+            return 1
+        return max(MIN_CIRCLE_POINTS, math.ceil(2 * math.pi * self.radius / step)) + 1
+
+    def corners(self):
+        """Return a mask of the polyline's points that need corner dwell."""
+        if self.points is None or len(self.points) < 3:
+            return np.zeros(0 if self.points is None else len(self.points), dtype=bool)
+        directions = np.diff(self.points, axis=0)
+        lengths = np.hypot(*directions.T)
+        cosine = np.divide((directions[:-1] * directions[1:]).sum(axis=1), lengths[:-1] * lengths[1:],
+                           out=np.ones(len(lengths) - 1), where=(lengths[:-1] * lengths[1:]) > 0)
+        corners = np.zeros(len(self.points), dtype=bool)
+        corners[1:-1] = cosine < math.cos(math.radians(CORNER_ANGLE))
+        return corners
+
+    def draw(self, entry, reverse, step):
+        """Return the lit points of the figure from its entry, with corner dwell."""
+        if self.points is None:
+            if self.radius <= 0:
+                return self.center[None, :]
+            count = self.lit_points(step) - 1
+            start = math.atan2(entry[1] - self.center[1], entry[0] - self.center[0])
+            angles = start + np.linspace(0, 2 * math.pi, count + 1)
+            return self.center + self.radius * np.column_stack((np.cos(angles), np.sin(angles)))
+        points, corners = self.points, self.corners()
+        if reverse:
+            points, corners = points[::-1], corners[::-1]
+        drawn = [points[:1]]
+        for start, end, corner in zip(points[:-1], points[1:], corners[1:]):
+            count = max(1, math.ceil(math.hypot(*(end - start)) / step))
+            drawn.append(start + (end - start) * (np.arange(1, count + 1) / count)[:, None])
+            if corner:
+                drawn.append(np.repeat(end[None, :], CORNER_DWELL, axis=0))
+        return np.concatenate(drawn)
+
+
+def scene_figures(compiled, elapsed, size, paths=False):
+    """Return the Figures of a compiled scene at a scene time, mapping size pixels onto the ILDA square."""
+    center = np.array(size, dtype=np.float64) / 2
+    units = ILDA_MAX / center.max()
+
+    def to_ilda(positions):
+        return (np.asarray(positions, dtype=np.float64) - center) * (units, -units)
+
+    compiled.seek(elapsed)
+    positions, radii, colors = compiled.evaluate(center)
+    figures = [Figure(color, position, radius * units)
+               for color, position, radius in zip(colors.tolist(), to_ilda(positions), radii.tolist())]
+    if paths:
+        color = compiled.color.astype(np.intp).tolist()
+        for index, path_center, path_radius in zip(compiled.circular, to_ilda(compiled.path_center),
+                                                   compiled.path_radius):
+            figures.append(Figure(color[index], path_center, path_radius * units))
+        for index, offset, segments in zip(compiled.path, compiled.path_offset, compiled.segment_count):
+            figures.append(Figure(color[index], None, 0.0, to_ilda(compiled.points[offset:offset + segments + 1])))
+    return figures
+
+
+def plan_tour(figures, start):
+    """Order figures to keep the blanked travel between them short.
+
+    Returns [(figure, entry, exit, reverse)]. A circle is entered and left at
+    its point nearest the previous figure's exit, a polyline from either end.
+    The nearest-neighbour tour is then improved by 2-opt moves, which reverse
+    a stretch of the tour when that shortens it.
+    """
+    count = len(figures)
+    if not count:
+        return []
+    first = np.array([figure.center if figure.points is None else figure.points[0] for figure in figures])
+    last = np.array([figure.center if figure.points is None else figure.points[-1] for figure in figures])
+    radius = np.array([figure.radius if figure.points is None else 0.0 for figure in figures])
+
+    # Nearest neighbour: from the current exit, go to the figure whose nearest entry is closest
+    remaining = np.ones(count, dtype=bool)
+    position = np.asarray(start, dtype=np.float64)
+    order, entries, exits, reversed_ = [], [], [], []
+    for _ in range(count):
+        to_first = np.abs(np.hypot(*(first - position).T) - radius)
+        to_last = np.abs(np.hypot(*(last - position).T) - radius)
+        distance = np.where(remaining, np.minimum(to_first, to_last), np.inf)
+        index = int(np.argmin(distance))
+        remaining[index] = False
+        reverse = bool(to_last[index] < to_first[index])
+        if radius[index] > 0:
+            offset = position - first[index]
+            length = math.hypot(*offset)
+            direction = offset / length if length > 0 else np.array([1.0, 0.0])
+            entry = exit_ = first[index] + radius[index] * direction
+        elif reverse:
+            entry, exit_ = last[index], first[index]
+        else:
+            entry, exit_ = first[index], last[index]
+        order.append(index)
+        entries.append(entry)
+        exits.append(exit_)
+        reversed_.append(reverse)
+        position = exit_
+
+    entries, exits, reversed_ = np.array(entries), np.array(exits), np.array(reversed_)
+    if count <= TWO_OPT_LIMIT:
+        order = np.array(order)
+        start = np.asarray(start, dtype=np.float64)
+        for _ in range(count):
+            improved = False
+            for i in range(count - 1):
+                before = start if i == 0 else exits[i - 1]
+                j = np.arange(i + 1, count)
+                following = np.vstack((entries[j[:-1] + 1], [[np.nan, np.nan]]))
+                old = math.hypot(*(before - entries[i])) + np.nan_to_num(np.hypot(*(exits[j] - following).T))
+                new = np.hypot(*(before - exits[j]).T) + np.nan_to_num(np.hypot(*(entries[i] - following).T))
+                best = int(np.argmin(new - old))
+                if new[best] - old[best] < -1e-6:
+                    # Reverse the stretch i..j; each figure in it is drawn the other way round
+                    end = j[best] + 1
+                    order[i:end] = order[i:end][::-1]
+                    entries[i:end], exits[i:end] = exits[i:end][::-1].copy(), entries[i:end][::-1].copy()
+                    reversed_[i:end] = ~reversed_[i:end][::-1]
+                    improved = True
+            if not improved:
+                break
+    return [(figures[index], entry, exit_, bool(reverse))
+            for index, entry, exit_, reverse in zip(order, entries, exits, reversed_)]
+
+
+def travel(tour, start):
+    """Return the blanked distance the galvos cover between the figures of a tour."""
+    position, distance = np.asarray(start, dtype=np.float64), 0.0
+    for _, entry, exit_, _ in tour:
+        distance += math.hypot(*(entry - position))
+        position = exit_
+    return distance
+
+
+def scene_order(figures):
+    """Return the figures as a tour in scene order, each entered at a fixed point, to compare tours with."""
+    tour = []
+    for figure in figures:
+        if figure.points is None:
+            entry = exit_ = figure.center + (figure.radius, 0.0)
+        else:
+            entry, exit_ = figure.points[0], figure.points[-1]
+        tour.append((figure, entry, exit_, False))
+    return tour
+
+
+def blank_points(start, end):
+    """Return the blanked points from start to end, ending with dwell on end."""
+    count = max(1, math.ceil(math.hypot(*(end - start)) / BLANK_STEP))
+    path = start + (end - start) * (np.arange(1, count + 1) / count)[:, None]
+    return np.vstack((path, np.repeat(end[None, :], DWELL, axis=0)))
+
+
+def fit_budget(tour, start, budget, step=DRAW_STEP):
+    """Return (figures kept, draw step) so that the tour's frame has at most budget points.
+
+    Lit points are spread further apart until the frame fits; figures are
+    dropped from the end of the tour only if it does not fit even with
+    every figure drawn with its fewest points.
+    """
+    if not tour:
+        return 0, step
+    position, fixed = np.asarray(start, dtype=np.float64), []
+    for figure, entry, exit_, _ in tour:
+        fixed.append(len(blank_points(position, entry)) + DWELL + CORNER_DWELL * int(figure.corners().sum()))
+        position = exit_
+    fixed = np.array(fixed)
+    fewest = np.array([figure.lit_points(math.inf) for figure, _, _, _ in tour])
+    keep = int(np.searchsorted(np.cumsum(fixed + fewest), budget, side="right"))
+    while keep:
+        lit = sum(figure.lit_points(step) for figure, _, _, _ in tour[:keep])
+        if fixed[:keep].sum() + lit <= budget:
+            break
+        step *= max(1.05, lit / (budget - fixed[:keep].sum()))
+    return keep, step
+
+
+def frame_points(tour, start, budget):
+    """Return the frame's points, colors and blanked mask, and how many figures were dropped."""
+    keep, step = fit_budget(tour, start, budget)
+    position = np.asarray(start, dtype=np.float64)
+    points, colors, blanked = [], [], []
+    for figure, entry, exit_, reverse in tour[:keep]:
+        travel_points = blank_points(position, entry)
+        lit = figure.draw(entry, reverse, step)
+        lit = np.vstack((lit, np.repeat(lit[-1:], DWELL, axis=0)))
+        points += [travel_points, lit]
+        colors += [np.zeros((len(travel_points), 3)), np.repeat([figure.color], len(lit), axis=0)]
+        blanked += [np.ones(len(travel_points), dtype=bool), np.zeros(len(lit), dtype=bool)]
+        position = exit_
+    if not points:
+        # An empty frame still needs a point; park the beam blanked where it is
+        return position[None, :], np.zeros((1, 3)), np.ones(1, dtype=bool), len(tour)
+    return np.concatenate(points), np.concatenate(colors), np.concatenate(blanked), len(tour) - keep
+
+
+def ilda_frame(points, colors, blanked, number, total, name="spyLAZ"):
+    """Return one format 5 (2D true color) ILDA frame."""
+    records = np.empty(len(points), dtype=RECORD)
+    clipped = np.clip(np.round(points), -ILDA_MAX - 1, ILDA_MAX).astype(np.int16)
+    records["x"], records["y"] = clipped[:, 0], clipped[:, 1]
+    records["status"] = np.where(blanked, BLANKED, 0)
+    records["status"][-1] |= LAST_POINT
+    colors = np.clip(colors, 0, 255).astype(np.uint8)
+    records["r"], records["g"], records["b"] = colors[:, 0], colors[:, 1], colors[:, 2]
+    header = HEADER.pack(b"ILDA", TRUE_COLOR_2D, name.encode("ascii", "replace")[:8], b"spyLAZ", len(points), number,
+                         total, 0)
+    return header + records.tobytes()
+
+
+def export_ilda(scene, file_path, duration, fps, pps, size=(1920, 1080), paths=False):
+    """Write a scene as ILDA frames and return per-frame stats."""
+    compiled = CompiledScene(scene)
+    total = round(duration * fps)
+    if not 0 < total <= 65535:
+        raise ValueError("an ILDA file holds 1 to 65535 frames")
+    budget = int(pps / fps)
+    start = np.zeros(2)
+    stats = []
+    with open(file_path, "wb") as file:
+        for number in range(total):
+            figures = scene_figures(compiled, number / fps, size, paths)
+            tour = plan_tour(figures, start)
+            points, colors, blanked, dropped = frame_points(tour, start, budget)
+            file.write(ilda_frame(points, colors, blanked, number, total, compiled.name))
+            stats.append((len(figures), dropped, len(points), int(blanked.sum()), travel(tour, start),
+                          travel(scene_order(figures), start)))
+            start = points[-1]  # The next frame starts where the galvos are
+        file.write(HEADER.pack(b"ILDA", TRUE_COLOR_2D, b"", b"spyLAZ", 0, total, total, 0))
+    return np.array(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a spyLAZ scene as ILDA laser frames.")
+    parser.add_argument("scene", help=".spyLAZ file")
+    parser.add_argument("--out", required=True, help=".ild file to write")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of the scene to export")
+    parser.add_argument("--fps", type=float, default=30.0, help="frames per second the file is played at")
+    parser.add_argument("--pps", type=int, default=30000, help="points per second the scanner draws")
+    parser.add_argument("--size", default="1920x1080", help="scene canvas WIDTHxHEIGHT mapped onto the scan area")
+    parser.add_argument("--paths", action="store_true", help="also draw every object's motion path")
+    args = parser.parse_args()
+
+    try:
+        size = tuple(int(v) for v in args.size.lower().split("x"))
+        if len(size) != 2 or min(size) <= 0 or args.fps <= 0 or args.pps < args.fps:
+            raise ValueError("size, fps and pps must be positive, with at least one point per frame")
+        stats = export_ilda(load_scene_file(args.scene), args.out, args.duration, args.fps, args.pps, size,
+                            args.paths)
+    except ValueError as e:
+        parser.error(str(e))
+
+    figures, dropped, points, blanked, optimized, unordered = stats.T
+    print(f"Wrote {len(stats)} frames of at most {int(args.pps / args.fps)} points to {args.out}")
+    print(f"figures per frame: {int(figures.max())}, points per frame: p50 {np.percentile(points, 50):.0f} "
+          f"max {int(points.max())}, blanked {blanked.sum() / points.sum():.0%}")
+    print(f"blanked travel: {optimized.mean():.0f} ILDA units per frame, "
+          f"{unordered.mean():.0f} in scene order")
+    if dropped.any():
+        print(f"{int((dropped > 0).sum())} frames dropped up to {int(dropped.max())} figures to fit the budget; "
+              f"at most {int((figures - dropped).min())} figures fit every frame")
+    else:
+        print("Every figure fits every frame.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import functools
+import json
+import os
+
+import numpy as np
+
+# Output calibrations kept next to the scenes in a scene folder
+CALIBRATION_FILE = "calibration.json"
+
+# Name of the output on the monitor chosen in the GUI
+MAIN_OUTPUT = "Main"
+
+# Corner order of a keystone, clockwise from the top left
+CORNERS = ("Top left", "Top right", "Bottom right", "Bottom left")
+
+# Cells across the width of the calibration grid
+GRID_CELLS = 16
+
+
+def rectangle(size):
+    """Return the corners of an output of the given size, which leave it uncorrected."""
+    width, height = size
+    return ((0.0, 0.0), (float(width), 0.0), (float(width), float(height)), (0.0, float(height)))
+
+
+def homography(source, target):
+    """Return the 3x3 matrix mapping four source points onto four target points.
+
+    Raises ValueError if the target points do not outline a convex shape.
+    """
+    rows, values = [], []
+    for (x, y), (u, v) in zip(source, target):
+        rows.append((x, y, 1, 0, 0, 0, -u * x, -u * y))
+        rows.append((0, 0, 0, x, y, 1, -v * x, -v * y))
+        values += (u, v)
+    try:
+        solution = np.linalg.solve(np.array(rows, dtype=np.float64), np.array(values, dtype=np.float64))
+    except np.linalg.LinAlgError:
+        raise ValueError("three of the corners are on one line") from None
+    matrix = np.append(solution, 1.0).reshape(3, 3)
+    # A projector cannot show a folded or concave outline; such corners put the horizon inside it
+    w = matrix[2, 0] * np.array([x for x, _ in source]) + matrix[2, 1] * np.array([y for _, y in source]) + 1.0
+    if (w <= 0).any() or abs(np.linalg.det(matrix)) < 1e-12:
+        raise ValueError("the corners must outline a convex shape")
+    return matrix
+
+
+@functools.lru_cache(maxsize=64)
+def keystone_homography(size, corners):
+    """Return the homography moving an output's corners to the calibrated ones."""
+    return homography(rectangle(size), corners)
+
+
+def warp(matrix, positions, radii):
+    """Map positions through a homography and scale radii by its local magnification.
+
+    Objects are moved, not the image, so the cost is a few array operations
+    per frame however large the output is. Objects mapped from behind the
+    projector's horizon get radius 0 and are not drawn.
+    """
+    x, y = positions[:, 0], positions[:, 1]
+    w = matrix[2, 0] * x + matrix[2, 1] * y + matrix[2, 2]
+    visible = w > 1e-9
+    w = np.where(visible, w, 1.0)
+    warped = np.empty((len(positions), 2), dtype=np.float64)
+    warped[:, 0] = (matrix[0, 0] * x + matrix[0, 1] * y + matrix[0, 2]) / w
+    warped[:, 1] = (matrix[1, 0] * x + matrix[1, 1] * y + matrix[1, 2]) / w
+    # The area around a point grows by det(H) / w^3, so lengths grow by its square root
+    magnification = np.sqrt(abs(np.linalg.det(matrix)) / w ** 3)
+    return warped, np.where(visible, radii * magnification, 0.0)
+
+
+@functools.lru_cache(maxsize=16)
+def grid_lines(size, corners=None, cells=GRID_CELLS):
+    """Return the calibration grid of an output as ((x1, y1), (x2, y2)) lines in its pixels.
+
+    Straight lines stay straight under a homography, so only the ends are warped.
+    """
+    width, height = size
+    step = width / cells
+    ends = [((x, 0.0), (x, float(height))) for x in np.arange(0.0, width + 0.5, step)]
+    ends += [((0.0, y), (float(width), y)) for y in np.arange(height / 2 % step, height + 0.5, step)]
+    ends += [((0.0, 0.0), (float(width), float(height))), ((float(width), 0.0), (0.0, float(height)))]
+    points = np.array(ends, dtype=np.float64).reshape(-1, 2)
+    if corners is not None:
+        points, _ = warp(keystone_homography(size, corners), points, np.zeros(len(points)))
+    return tuple(tuple(map(tuple, line)) for line in np.trunc(points).reshape(-1, 2, 2).tolist())
+
+
+def load_calibration(folder):
+    """Return {output name: corners} from the folder's calibration file, or {} without one."""
+    file_path = os.path.join(folder, CALIBRATION_FILE) if folder else None
+    if not file_path or not os.path.exists(file_path):
+        return {}
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        calibration = {}
+        for name, entry in data["outputs"].items():
+            corners = tuple((float(x), float(y)) for x, y in entry["corners"])
+            if len(corners) != 4:
+                raise ValueError(f"output '{name}' needs four corners")
+            homography(rectangle((1, 1)), corners)  # Rejects degenerate corners
+            calibration[name] = corners
+    except (OSError, ValueError, AttributeError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid calibration {file_path}: {e}") from e
+    return calibration
+
+
+def save_calibration(folder, calibration):
+    """Write {output name: corners} to the folder's calibration file."""
+    file_path = os.path.join(folder, CALIBRATION_FILE)
+    data = {"outputs": {name: {"corners": [list(corner) for corner in corners]}
+                        for name, corners in calibration.items()}}
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=4)
+    return file_path
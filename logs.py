@@ -0,0 +1,100 @@
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+
+
+def default_log_path():
+    """Return the per-user log file."""
+    base = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_STATE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "StageLaserProjection", "logs", "StageLaserProjection.log")
+
+
+# Messages waiting for the GUI; new ones are dropped and counted beyond this
+QUEUE_LIMIT = 1000
+
+# Messages moved to the GUI per drain(), so a burst is spread over several calls
+DRAIN_LIMIT = 200
+
+
+class LogSink:
+    """Collects log messages from any thread and hands them to the GUI in batches.
+
+    write() only counts or queues the message under a short lock, so the
+    render, DMX and cue threads never wait for Tk. A message is queued the
+    first time; repeats within the next window seconds are only counted, and
+    drain() shows one "(xN in last 1 s)" line per window while they go on.
+    At most QUEUE_LIMIT messages wait and drain() moves up to DRAIN_LIMIT per
+    call. With a file path every line shown is also written to a log file
+    rotated at max_bytes.
+    """
+
+    def __init__(self, window=1.0, file_path=None, max_bytes=1024 * 1024, backups=3, clock=time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.queue = deque()
+        self.dropped = 0
+        self.repeats = {}  # Message -> [window start, repeats counted in it]
+        self.file_logger = None
+        if file_path:
+            self.open_file(file_path, max_bytes, backups)
+
+    def write(self, message):
+        """Queue a message, or count it if it is a repeat; safe and cheap to call from any thread."""
+        with self.lock:
+            repeat = self.repeats.get(message)
+            if repeat is not None:
+                repeat[1] += 1
+            elif len(self.queue) >= QUEUE_LIMIT:
+                self.dropped += 1
+            else:
+                self.queue.append(message)
+                self.repeats[message] = [self.clock(), 0]
+
+    def open_file(self, file_path, max_bytes=1024 * 1024, backups=3):
+        """Also write every message to a rotating log file."""
+        self.close_file()
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        self.file_logger = logging.getLogger(f"{__name__}.{id(self)}")
+        self.file_logger.propagate = False
+        self.file_logger.setLevel(logging.INFO)
+        self.file_logger.addHandler(handler)
+
+    def close_file(self):
+        """Stop writing the log file."""
+        if self.file_logger is not None:
+            for handler in list(self.file_logger.handlers):
+                self.file_logger.removeHandler(handler)
+                handler.close()
+            self.file_logger = None
+
+    def drain(self, limit=DRAIN_LIMIT):
+        """Return the lines to show for up to limit queued messages and the repeat windows that ended."""
+        now = self.clock()
+        lines = []
+        with self.lock:
+            # Close the windows that are over, reporting the repeats they counted
+            for message, (start, count) in list(self.repeats.items()):
+                if now - start >= self.window:
+                    if count:
+                        lines.append(f"{message} (x{count} in last {self.window:g} s)")
+                        self.repeats[message] = [now, 0]
+                    else:
+                        del self.repeats[message]
+            for _ in range(min(limit, len(self.queue))):
+                lines.append(self.queue.popleft())
+            if self.dropped and not self.queue:
+                lines.append(f"{self.dropped} log messages dropped, too many at once")
+                self.dropped = 0
+
+        if self.file_logger is not None:
+            for line in lines:
+                self.file_logger.info(line)
+        return lines
@@ -3,56 +3,72 @@ import tkinter as tk
 from tkinter import ttk, filedialog
 import pygame
 import threading
+import queue
+import multiprocessing
 from screeninfo import get_monitors
 import os
-import json
-import glob
 import math
-import base64
-import random
-import socket
 from tkinter.colorchooser import askcolor
 
+from cues import CueScheduler, folder_cue_list
+from dmx import (FIXTURE_CHANNELS, MERGE_MODES, DmxInput, DmxParameters, DmxTestSender, FixturePatch,
+                 ParameterStore)
+from keystone import CORNERS, MAIN_OUTPUT, keystone_homography, load_calibration, rectangle, save_calibration
+from logs import LogSink, default_log_path
+from motion import TRANSITIONS, CompiledScene, ScenePreparer, morph_frames
+from osc import OSC_PORT, OscServer
+from outputs import Output, OutputGroup, folder_output_list
+from render import RENDERERS, FrameComposer, StatsOverlay, draw_lines
+from scenes import SceneCache, SceneFolderWatcher, load_scene_folder, plain_scene
+from sync import SYNC_PORT, SyncFollower, SyncMaster
+from timing import FrameScheduler, FrameStats, ShowClock
 
-class ArtNetReceiver(threading.Thread):
-    def __init__(self, app):
-        super().__init__(daemon=True)
-        self.app = app
-        self.dmx_channel = 0
-        self.running = True
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.bind(("0.0.0.0", 6454))  # Default Art-Net port
+# Milliseconds between slider updates from the shared laser settings
+SLIDER_MIRROR_INTERVAL = 50
 
-    def run(self):
-        while self.running:
-            try:
-                data, _ = self.sock.recvfrom(1024)
-                if data[:8] == b"Art-Net\0" and data[8:10] == b"\x00\x50":
-                    # Parse ArtDMX packet
-                    dmx_data = data[18:]  # DMX data starts at byte 18
-                    if len(dmx_data) > 511:
-                        brightness = dmx_data[0]
-                        speed = dmx_data[1]
-                        radius = dmx_data[2]
-                        shift_x = dmx_data[3]
-                        shift_y = dmx_data[4]
-                        scale = dmx_data[5]
-                        self.app.update_slider(brightness, speed, radius, shift_x, shift_y, scale)
-            except Exception as e:
-                print(f"Art-Net receiver error: {e}")
-
-    def stop(self):
-        self.running = False
-        self.sock.close()
+# Milliseconds between checks on a scene folder being loaded
+LOAD_POLL_INTERVAL = 100
+
+# Seconds between scans of a loaded scene folder for changed files
+WATCH_INTERVAL = 1.0
+
+# Frame rate choices; VSync paces frames by the display instead of a timer
+FRAME_RATES = ["60", "120", "144", "240", "VSync"]
+
+# Milliseconds between moving queued log messages into the log widget
+LOG_DRAIN_INTERVAL = 100
+
+# Lines kept in the log widget; older ones are deleted
+MAX_LOG_LINES = 1000
+
+# Key that shows or hides the frame stats overlay on the projection
+STATS_OVERLAY_KEY = pygame.K_F3
+
+# Roles of this machine when several projection PCs share one show clock
+SYNC_MODES = ["Off", "Master", "Follower"]
+
+# Milliseconds between clock sync reports in the log
+SYNC_REPORT_INTERVAL = 30000
 
 class StageLaserProjectionApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Stage Laser Projection")
 
-        # Art-Net Receiver
-        self.artnet_receiver = ArtNetReceiver(self)
-        self.artnet_receiver.start()
+        # Messages from every thread, shown in the log widget by the Tk thread
+        self.log_sink = LogSink()
+
+        # Shared laser settings, written by DMX input and the sliders, read by the renderer
+        self.parameters = ParameterStore()
+        self.mirrored_parameters = self.parameters.current
+
+        # Master clock of scene time, free-running or chasing Art-Net timecode
+        self.show_clock = ShowClock()
+
+        # Art-Net and sACN input, merged per universe
+        self.dmx_input = DmxInput(patch=[FixturePatch(0, 1, self.parameters)], log=self.log,
+                                  on_timecode=self.show_clock.timecode)
+        self.dmx_input.start()
 
         # Monitor selection
         self.monitor_label = tk.Label(root, text="Select Monitor for Projection:")
@@ -75,6 +91,14 @@ class StageLaserProjectionApp:
         self.browse_button = tk.Button(root, text="Browse Folder", command=self.browse_folder)
         self.browse_button.pack(pady=5)
 
+        self.load_progress = ttk.Progressbar(root, orient="horizontal", length=300, mode="determinate")
+        self.load_progress.pack(pady=5)
+
+        self.watch_var = tk.BooleanVar(value=True)
+        self.watch_checkbox = tk.Checkbutton(root, text="Reload changed scene files",
+                                             variable=self.watch_var, command=self.toggle_watching)
+        self.watch_checkbox.pack(pady=5)
+
         # Scene selection
         self.scene_label = tk.Label(root, text="Select Scene for Laser Animation:")
         self.scene_label.pack(pady=5)
@@ -94,7 +118,8 @@ class StageLaserProjectionApp:
         brightness_label = tk.Label(brightness_frame, text="Brightness:")
         brightness_label.pack(side="left", padx=5)
 
-        self.brightness_slider = tk.Scale(brightness_frame, from_=0, to=255, orient="horizontal")
+        self.brightness_slider = tk.Scale(brightness_frame, from_=0, to=255, orient="horizontal",
+                                          command=lambda value: self.slider_moved("brightness", value))
         self.brightness_slider.set(255)
         self.brightness_slider.pack(side="left", fill="x", expand=True)
 
@@ -105,7 +130,8 @@ class StageLaserProjectionApp:
         speed_label = tk.Label(speed_frame, text="Speed:")
         speed_label.pack(side="left", padx=5)
 
-        self.speed_slider = tk.Scale(speed_frame, from_=0, to=255, orient="horizontal")
+        self.speed_slider = tk.Scale(speed_frame, from_=0, to=255, orient="horizontal",
+                                     command=lambda value: self.slider_moved("speed", value))
         self.speed_slider.set(128)
         self.speed_slider.pack(side="left", fill="x", expand=True)
 
@@ -116,7 +142,8 @@ class StageLaserProjectionApp:
         radius_label = tk.Label(radius_frame, text="Radius:")
         radius_label.pack(side="left", padx=5)
 
-        self.radius_slider = tk.Scale(radius_frame, from_=0, to=255, orient="horizontal")
+        self.radius_slider = tk.Scale(radius_frame, from_=0, to=255, orient="horizontal",
+                                      command=lambda value: self.slider_moved("radius", value))
         self.radius_slider.set(128)
         self.radius_slider.pack(side="left", fill="x", expand=True)
 
@@ -128,7 +155,8 @@ class StageLaserProjectionApp:
         x_shift_label = tk.Label(shift_scale_frame, text="X Shift:")
         x_shift_label.pack(side="left", padx=5)
 
-        self.x_shift_slider = tk.Scale(shift_scale_frame, from_=0, to=255, orient="horizontal")
+        self.x_shift_slider = tk.Scale(shift_scale_frame, from_=0, to=255, orient="horizontal",
+                                       command=lambda value: self.slider_moved("shift_x", value))
         self.x_shift_slider.set(128)
         self.x_shift_slider.pack(side="left", fill="x", expand=True)
 
@@ -136,7 +164,8 @@ class StageLaserProjectionApp:
         y_shift_label = tk.Label(shift_scale_frame, text="Y Shift:")
         y_shift_label.pack(side="left", padx=5)
 
-        self.y_shift_slider = tk.Scale(shift_scale_frame, from_=0, to=255, orient="horizontal")
+        self.y_shift_slider = tk.Scale(shift_scale_frame, from_=0, to=255, orient="horizontal",
+                                       command=lambda value: self.slider_moved("shift_y", value))
         self.y_shift_slider.set(128)
         self.y_shift_slider.pack(side="left", fill="x", expand=True)
 
@@ -147,10 +176,173 @@ class StageLaserProjectionApp:
         scale_label = tk.Label(scale_frame, text="Scale:")
         scale_label.pack(side="left", padx=5)
 
-        self.scale_slider = tk.Scale(scale_frame, from_=0, to=255, orient="horizontal", resolution=0.1)
+        self.scale_slider = tk.Scale(scale_frame, from_=0, to=255, orient="horizontal", resolution=0.1,
+                                     command=lambda value: self.slider_moved("scale", value))
         self.scale_slider.set(128)
         self.scale_slider.pack(side="left", fill="x", expand=True)
 
+        # Trail Slider, 0 leaves the trail to the scene
+        trail_label = tk.Label(scale_frame, text="Trail:")
+        trail_label.pack(side="left", padx=5)
+
+        self.trail_slider = tk.Scale(scale_frame, from_=0, to=255, orient="horizontal",
+                                     command=lambda value: self.slider_moved("trail", value))
+        self.trail_slider.set(0)
+        self.trail_slider.pack(side="left", fill="x", expand=True)
+
+        # DMX patch of the projection fixture
+        patch_frame = tk.Frame(root)
+        patch_frame.pack(pady=5, fill="x")
+
+        universe_label = tk.Label(patch_frame, text="Universe:")
+        universe_label.pack(side="left", padx=5)
+
+        self.universe_var = tk.IntVar(value=0)
+        self.universe_spinbox = tk.Spinbox(patch_frame, from_=0, to=32767, width=6,
+                                           textvariable=self.universe_var, command=self.patch_fixture)
+        self.universe_spinbox.pack(side="left")
+        self.universe_spinbox.bind("<Return>", self.patch_fixture)
+        self.universe_spinbox.bind("<FocusOut>", self.patch_fixture)
+
+        address_label = tk.Label(patch_frame, text="Start Address:")
+        address_label.pack(side="left", padx=5)
+
+        self.address_var = tk.IntVar(value=1)
+        self.address_spinbox = tk.Spinbox(patch_frame, from_=1, to=513 - FIXTURE_CHANNELS, width=4,
+                                          textvariable=self.address_var, command=self.patch_fixture)
+        self.address_spinbox.pack(side="left")
+        self.address_spinbox.bind("<Return>", self.patch_fixture)
+        self.address_spinbox.bind("<FocusOut>", self.patch_fixture)
+
+        merge_label = tk.Label(patch_frame, text="Merge:")
+        merge_label.pack(side="left", padx=5)
+
+        self.merge_combobox = ttk.Combobox(patch_frame, state="readonly", width=5,
+                                           values=[mode.upper() for mode in MERGE_MODES])
+        self.merge_combobox.current(0)
+        self.merge_combobox.pack(side="left")
+        self.merge_combobox.bind("<<ComboboxSelected>>", self.change_merge_mode)
+
+        # Frame rate
+        frame_rate_frame = tk.Frame(root)
+        frame_rate_frame.pack(pady=5)
+
+        frame_rate_label = tk.Label(frame_rate_frame, text="Frame Rate:")
+        frame_rate_label.pack(side="left", padx=5)
+
+        self.frame_rate_combobox = ttk.Combobox(frame_rate_frame, values=FRAME_RATES, width=7)
+        self.frame_rate_combobox.current(0)
+        self.frame_rate_combobox.pack(side="left")
+
+        renderer_label = tk.Label(frame_rate_frame, text="Renderer:")
+        renderer_label.pack(side="left", padx=5)
+
+        self.renderer_combobox = ttk.Combobox(frame_rate_frame, state="readonly", width=12,
+                                              values=list(RENDERERS))
+        self.renderer_combobox.current(0)
+        self.renderer_combobox.pack(side="left")
+
+        self.timecode_var = tk.BooleanVar(value=False)
+        self.timecode_checkbox = tk.Checkbutton(frame_rate_frame, text="Chase Art-Net timecode",
+                                                variable=self.timecode_var, command=self.toggle_timecode)
+        self.timecode_checkbox.pack(side="left", padx=5)
+
+        # Clock sync between projection PCs
+        sync_frame = tk.Frame(root)
+        sync_frame.pack(pady=5)
+
+        sync_label = tk.Label(sync_frame, text="Clock Sync:")
+        sync_label.pack(side="left", padx=5)
+
+        self.sync_combobox = ttk.Combobox(sync_frame, state="readonly", width=9, values=SYNC_MODES)
+        self.sync_combobox.current(0)
+        self.sync_combobox.pack(side="left")
+        self.sync_combobox.bind("<<ComboboxSelected>>", self.change_sync)
+
+        master_label = tk.Label(sync_frame, text="Master:")
+        master_label.pack(side="left", padx=5)
+
+        self.sync_master_entry = tk.Entry(sync_frame, width=16)
+        self.sync_master_entry.insert(0, "127.0.0.1")
+        self.sync_master_entry.pack(side="left")
+
+        # Remote control over OSC
+        osc_frame = tk.Frame(root)
+        osc_frame.pack(pady=5)
+
+        self.osc_var = tk.BooleanVar(value=False)
+        self.osc_checkbox = tk.Checkbutton(osc_frame, text="OSC control on port", variable=self.osc_var,
+                                           command=self.toggle_osc)
+        self.osc_checkbox.pack(side="left", padx=5)
+
+        self.osc_port_entry = tk.Entry(osc_frame, width=6)
+        self.osc_port_entry.insert(0, str(OSC_PORT))
+        self.osc_port_entry.pack(side="left")
+
+        # Scene change transition
+        transition_frame = tk.Frame(root)
+        transition_frame.pack(pady=5)
+
+        transition_label = tk.Label(transition_frame, text="Transition:")
+        transition_label.pack(side="left", padx=5)
+
+        self.transition_combobox = ttk.Combobox(transition_frame, state="readonly", width=10,
+                                                values=TRANSITIONS)
+        self.transition_combobox.current(0)
+        self.transition_combobox.bind("<<ComboboxSelected>>", self.change_transition)
+        self.transition_combobox.pack(side="left")
+
+        fade_label = tk.Label(transition_frame, text="Seconds:")
+        fade_label.pack(side="left", padx=5)
+
+        self.fade_spinbox = tk.Spinbox(transition_frame, from_=0, to=60, increment=0.5, width=5,
+                                       command=self.change_transition)
+        self.fade_spinbox.delete(0, "end")
+        self.fade_spinbox.insert(0, "1.0")
+        self.fade_spinbox.bind("<Return>", self.change_transition)
+        self.fade_spinbox.bind("<FocusOut>", self.change_transition)
+        self.fade_spinbox.pack(side="left")
+
+        # Keystone calibration of the outputs
+        calibration_frame = tk.Frame(root)
+        calibration_frame.pack(pady=5)
+
+        self.grid_var = tk.BooleanVar(value=False)
+        self.grid_checkbox = tk.Checkbutton(calibration_frame, text="Calibration grid", variable=self.grid_var,
+                                            command=self.apply_calibration)
+        self.grid_checkbox.pack(side="left", padx=5)
+
+        self.calibration_output_combobox = ttk.Combobox(calibration_frame, state="readonly", width=12,
+                                                        values=[MAIN_OUTPUT])
+        self.calibration_output_combobox.current(0)
+        self.calibration_output_combobox.bind("<<ComboboxSelected>>", self.show_corner)
+        self.calibration_output_combobox.pack(side="left")
+
+        self.corner_combobox = ttk.Combobox(calibration_frame, state="readonly", width=12, values=CORNERS)
+        self.corner_combobox.current(0)
+        self.corner_combobox.bind("<<ComboboxSelected>>", self.show_corner)
+        self.corner_combobox.pack(side="left", padx=5)
+
+        self.corner_x_var = tk.IntVar(value=0)
+        self.corner_x_spinbox = tk.Spinbox(calibration_frame, from_=-10000, to=10000, width=6,
+                                           textvariable=self.corner_x_var, command=self.move_corner)
+        self.corner_x_spinbox.pack(side="left")
+        self.corner_x_spinbox.bind("<Return>", self.move_corner)
+
+        self.corner_y_var = tk.IntVar(value=0)
+        self.corner_y_spinbox = tk.Spinbox(calibration_frame, from_=-10000, to=10000, width=6,
+                                           textvariable=self.corner_y_var, command=self.move_corner)
+        self.corner_y_spinbox.pack(side="left", padx=5)
+        self.corner_y_spinbox.bind("<Return>", self.move_corner)
+
+        self.reset_calibration_button = tk.Button(calibration_frame, text="Reset",
+                                                  command=self.reset_calibration)
+        self.reset_calibration_button.pack(side="left")
+
+        self.save_calibration_button = tk.Button(calibration_frame, text="Save Calibration",
+                                                 command=self.save_calibration)
+        self.save_calibration_button.pack(side="left", padx=5)
+
         # Multi-scene playback
         self.playback_label = tk.Label(root, text="Multi-Scene Playback (seconds per scene):")
         self.playback_label.pack(pady=5)
@@ -165,6 +357,26 @@ class StageLaserProjectionApp:
                                                 variable=self.playback_var)
         self.playback_checkbox.pack(pady=5)
 
+        self.next_cue_button = tk.Button(root, text="Next Cue", command=self.next_cue)
+        self.next_cue_button.pack(pady=5)
+
+        # Frame statistics
+        stats_frame = tk.Frame(root)
+        stats_frame.pack(pady=5)
+
+        self.stats_var = tk.BooleanVar(value=False)
+        self.stats_checkbox = tk.Checkbutton(stats_frame, text="Record frame statistics (F3 shows them)",
+                                             variable=self.stats_var)
+        self.stats_checkbox.pack(side="left", padx=5)
+
+        self.export_stats_button = tk.Button(stats_frame, text="Export Stats", command=self.export_stats)
+        self.export_stats_button.pack(side="left", padx=5)
+
+        self.latency_test_var = tk.BooleanVar(value=False)
+        self.latency_test_checkbox = tk.Checkbutton(stats_frame, text="DMX latency test",
+                                                    variable=self.latency_test_var, command=self.toggle_latency_test)
+        self.latency_test_checkbox.pack(side="left", padx=5)
+
         # Interactive Controls
         self.edit_button = tk.Button(root, text="Edit Scene Live", command=self.edit_scene_live)
         self.edit_button.pack(pady=5)
@@ -183,23 +395,78 @@ class StageLaserProjectionApp:
         self.log_text = tk.Text(root, height=10, width=60, state="disabled")
         self.log_text.pack(pady=5)
 
+        self.log_file_var = tk.BooleanVar(value=False)
+        self.log_file_checkbox = tk.Checkbutton(root, text="Write log file", variable=self.log_file_var,
+                                                command=self.toggle_log_file)
+        self.log_file_checkbox.pack(pady=5)
+
         self.running = False
         self.running_thread = None
         self.current_scene_name = None
+        self.mirrored_scene_name = None  # Shown in the scene combobox
         self.selected_monitor = None
         self.playback_thread = None
         self.playback_active = False
+        self.target_fps = 60
+        self.renderer_name = next(iter(RENDERERS))
+        self.transition = (TRANSITIONS[0], 1.0)  # Mode and seconds, replaced as one value
+        self.mirrored_transition = self.transition  # Shown in the transition widgets
+        self.frame_stats = None  # Stats of the running or last show, if recorded
+        self.latency_test = None
+        self.outputs = []  # Extra outputs of the show, from the scene folder
+        self.main_output = None  # Output on the selected monitor while projecting
+        self.output_group = None
+        self.calibration = {}  # Output name -> keystone corners
+        self.sync = None  # SyncMaster or SyncFollower
+        self.osc = None  # OscServer whose commands the render loop applies
+        self.blackout = False  # Set by OSC; every output shows black while it is on
+        self.showing = None  # (scene name, show time it started) on screen, for followers
+        self.synced_start = None  # (scene name, show time it started) on the master
+        self.cue_start = None  # (scene name, show time its cue started) until the scene is swapped in
 
         # Scene data
         self.scenes = {}
         self.current_objects = []
+        self.scene_cache = SceneCache()
+        self.loading_thread = None
+        self.loading_status = (0, 0, None)
+        self.scene_folder = None
+        self.scene_index = {}
+        self.folder_watcher = None
+
+        self.root.after(SLIDER_MIRROR_INTERVAL, self.mirror_parameters)
+        self.root.after(LOG_DRAIN_INTERVAL, self.drain_log)
 
     def log(self, message):
-        """Log a message to the interactive log."""
-        self.log_text.config(state="normal")
-        self.log_text.insert("end", message + "\n")
-        self.log_text.config(state="disabled")
-        self.log_text.see("end")
+        """Log a message to the interactive log; safe to call from any thread."""
+        self.log_sink.write(message)
+
+    def drain_log(self):
+        """Move queued log messages into the log widget in one batch, keeping the last MAX_LOG_LINES."""
+        lines = self.log_sink.drain()
+        if lines:
+            self.log_text.config(state="normal")
+            self.log_text.insert("end", "\n".join(lines) + "\n")
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - MAX_LOG_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.config(state="disabled")
+            self.log_text.see("end")
+        self.root.after(LOG_DRAIN_INTERVAL, self.drain_log)
+
+    def toggle_log_file(self):
+        """Start or stop writing the log to a rotating file as well."""
+        if self.log_file_var.get():
+            file_path = default_log_path()
+            try:
+                self.log_sink.open_file(file_path)
+            except OSError as e:
+                self.log_file_var.set(False)
+                self.log(f"Could not open log file: {e}")
+                return
+            self.log(f"Writing log to {file_path}.")
+        else:
+            self.log_sink.close_file()
 
     def browse_folder(self):
         """Open a file dialog to select a folder containing .spyLAZ files."""
@@ -209,37 +476,110 @@ class StageLaserProjectionApp:
             self.load_scenes()
 
     def load_scenes(self):
-        """Load scenes from all .spyLAZ files in the selected folder."""
+        """Load scenes from all .spyLAZ files in the selected folder without blocking the GUI."""
         folder = self.folder_path.get()
         if not folder:
             self.log("No folder selected.")
             return
+        if self.loading_thread is not None:
+            self.log("Scenes are already being loaded.")
+            return
 
-        # Clear previous scenes
-        self.scenes = {}
+        self.browse_button.config(state="disabled")
+        self.loading_status = (0, 0, None)
+        self.loading_thread = threading.Thread(target=self.load_scenes_worker, args=(folder,), daemon=True)
+        self.loading_thread.start()
+        self.scene_folder = folder
+        self.toggle_watching()  # Stops the watcher of the previous folder
+        self.root.after(LOAD_POLL_INTERVAL, self.poll_scene_loading)
+
+    def load_scenes_worker(self, folder):
+        """Decode the scene folder in the background, reporting through loading_status."""
+        def progress(done, total):
+            self.loading_status = (done, total, None)
 
         try:
-            # Scan folder for .spyLAZ files
-            for file_path in glob.glob(os.path.join(folder, "*.spyLAZ")):
-                with open(file_path, "rb") as file:
-                    encoded_data = file.read()
-                    decoded_data = base64.b64decode(encoded_data).decode("utf-8")
-                    scene_data = json.loads(decoded_data)
-
-                    # Ensure the file contains a valid scene
-                    if "name" in scene_data and "objects" in scene_data:
-                        self.scenes[scene_data["name"]] = scene_data
-                    else:
-                        self.log(f"Invalid scene format in file: {file_path}")
-
-            # Update scene combobox
-            self.scene_combobox["values"] = list(self.scenes.keys())
-            if self.scenes:
-                self.scene_combobox.current(0)
-                self.current_scene_name = self.scene_combobox.get()
-            self.log(f"Loaded {len(self.scenes)} scenes from {folder}.")
+            result = load_scene_folder(folder, self.scene_cache, progress)
         except Exception as e:
-            self.log(f"Error loading scenes from folder: {e}")
+            result = ({}, [f"Error loading scenes from folder: {e}"], {})
+        self.loading_status = self.loading_status[:2] + (result,)
+
+    def poll_scene_loading(self):
+        """Show loading progress and publish the scenes once the worker is done."""
+        done, total, result = self.loading_status
+        self.load_progress["maximum"] = max(total, 1)
+        self.load_progress["value"] = done
+        if result is None:
+            self.root.after(LOAD_POLL_INTERVAL, self.poll_scene_loading)
+            return
+
+        self.loading_thread = None
+        self.browse_button.config(state="normal")
+        scenes, errors, self.scene_index = result
+        for message in errors:
+            self.log(message)
+
+        # Swap in the new scenes at once so the render thread never sees a partial library
+        self.scenes = scenes
+        self.toggle_watching()
+
+        # Update scene combobox
+        self.scene_combobox["values"] = list(self.scenes.keys())
+        if self.scenes:
+            self.scene_combobox.current(0)
+            self.current_scene_name = self.scene_combobox.get()
+        self.log(f"Loaded {len(self.scenes)} scenes from {self.folder_path.get()}.")
+
+        # Outputs and their calibration are kept with the scenes
+        try:
+            self.calibration = load_calibration(self.scene_folder)
+            self.outputs = folder_output_list(self.scene_folder, get_monitors())
+        except ValueError as e:
+            self.log(str(e))
+        self.calibration_output_combobox["values"] = [MAIN_OUTPUT] + [output.name for output in self.outputs]
+        self.calibration_output_combobox.current(0)
+        self.show_corner()
+
+    def toggle_watching(self):
+        """Start or stop reloading changed files of the loaded scene folder."""
+        if self.folder_watcher is not None:
+            self.folder_watcher.stop()
+            self.scene_index = self.folder_watcher.index
+            self.folder_watcher = None
+        if self.watch_var.get() and self.loading_thread is None and self.scene_folder:
+            changes = queue.Queue()
+            self.folder_watcher = SceneFolderWatcher(self.scene_folder, self.scene_index, changes.put,
+                                                     self.scene_cache, WATCH_INTERVAL)
+            self.folder_watcher.start()
+            self.root.after(LOAD_POLL_INTERVAL, self.apply_scene_changes, self.folder_watcher, changes)
+
+    def apply_scene_changes(self, watcher, changes):
+        """Merge scenes reloaded by the folder watcher into the library."""
+        if watcher is not self.folder_watcher:
+            return  # Replaced or stopped; a new load publishes its own scenes
+        pending = []
+        while True:
+            try:
+                pending.append(changes.get_nowait())
+            except queue.Empty:
+                break
+
+        if pending:
+            # Only changed names are replaced, so the playing scene keeps its compiled arrays
+            scenes = dict(self.scenes)
+            for removed, changed, messages in pending:
+                for name in removed:
+                    scenes.pop(name, None)
+                scenes.update(changed)
+                for message in messages:
+                    self.log(message)
+            self.scenes = scenes
+
+            selected = self.scene_combobox.get()
+            self.scene_combobox["values"] = list(self.scenes.keys())
+            if selected not in self.scenes:
+                self.scene_combobox.set("")
+        self.root.after(LOAD_POLL_INTERVAL, self.apply_scene_changes, watcher, changes)
 
     def start_scene(self):
         """Start the projection."""
@@ -254,15 +594,50 @@ class StageLaserProjectionApp:
             self.log("No scene selected or invalid scene.")
             return
 
-        self.running = True
+        frame_rate = self.frame_rate_combobox.get()
+        if frame_rate == "VSync":
+            self.target_fps = None
+        else:
+            try:
+                self.target_fps = float(frame_rate)
+                if self.target_fps <= 0:
+                    raise ValueError
+            except ValueError:
+                self.log(f"Invalid frame rate: {frame_rate}")
+                return
+
         self.playback_active = self.playback_var.get()
+        if self.playback_active:
+            try:
+                scene_duration = float(self.playback_entry.get())  # Default seconds per scene
+                if scene_duration <= 0:
+                    raise ValueError(f"Invalid scene duration: {self.playback_entry.get()}")
+                cues, loop = folder_cue_list(self.scene_folder, self.scenes, scene_duration)
+            except ValueError as e:
+                self.log(str(e))
+                return
+
+        try:
+            self.outputs = folder_output_list(self.scene_folder, get_monitors())
+        except ValueError as e:
+            self.log(str(e))
+            return
+        monitor = self.selected_monitor
+        self.main_output = Output(MAIN_OUTPUT, (monitor.x, monitor.y), (monitor.width, monitor.height), (0, 0), 1.0,
+                                  False)
+        self.main_output, *self.outputs = self.calibrated([self.main_output] + self.outputs)
+
+        self.renderer_name = self.renderer_combobox.get()
+        self.frame_stats = FrameStats() if self.stats_var.get() else None
+        self.running = True
 
         # Start projection thread
         self.running_thread = threading.Thread(target=self.run_scene, daemon=True).start()
 
         # Start multi-scene playback if enabled
         if self.playback_active:
-            self.running_thread = threading.Thread(target=self.multi_scene_playback, daemon=True).start()
+            self.playback_thread = CueScheduler(cues, self.cue_started, loop, self.show_clock.time)
+            self.playback_thread.start()
 
     def edit_scene_live(self):
         """Open a live editor for the current scene."""
@@ -275,161 +650,550 @@ class StageLaserProjectionApp:
             self.current_scene_name = new_scene_name
             self.log(f"Switched to scene: {new_scene_name}")
 
-    def multi_scene_playback(self):
-        """Cycle through scenes during playback."""
-        scene_names = list(self.scenes.keys())
-        scene_duration = int(self.playback_entry.get())  # Duration per scene in seconds
-
-        while self.playback_active and self.running:
-            for scene_name in scene_names:
-                if not (self.playback_active and self.running):
-                    break  # Exit if playback or running stops
-
-                # Update the current scene name
-                self.current_scene_name = scene_name
-                self.log(f"Playing scene: {scene_name}")
-
-                # Wait for the specified scene duration
-                for _ in range(scene_duration * 100):  # Check every 10 ms
-                    if not (self.playback_active and self.running):
-                        break
-                    pygame.time.wait(10)
+    def cue_started(self, number, cue, start):
+        """Switch to the scene of a cue that started at a show time; called by the cue scheduler."""
+        self.cue_start = (cue.scene, start)
+        self.current_scene_name = cue.scene
+        if cue.hold:
+            self.log(f"Cue {number}: {cue.scene} (hold, press Next Cue)")
+        else:
+            self.log(f"Cue {number}: {cue.scene} ({cue.duration:g} s)")
+
+    def next_cue(self):
+        """Release a hold cue or end the current cue early."""
+        if self.playback_thread is not None and self.playback_thread.is_alive():
+            self.playback_thread.go()
+        else:
+            self.log("No cue list is playing.")
 
     def run_scene(self):
         """Run the current scene with advanced motion rendering."""
         pygame.init()
 
         os.environ['SDL_VIDEO_WINDOW_POS'] = f"{self.selected_monitor.x},{self.selected_monitor.y}"
-        screen = pygame.display.set_mode((self.selected_monitor.width, self.selected_monitor.height), pygame.NOFRAME)
+        size = (self.selected_monitor.width, self.selected_monitor.height)
+        target_fps = self.target_fps
+        if target_fps is None:
+            # Let flip() wait for the display; falls back to 60 FPS if vsync is unavailable
+            try:
+                screen = pygame.display.set_mode(size, pygame.NOFRAME | pygame.SCALED, vsync=1)
+            except pygame.error as e:
+                self.log(f"VSync unavailable ({e}), using 60 FPS.")
+                target_fps = 60
+        if target_fps is not None:
+            screen = pygame.display.set_mode(size, pygame.NOFRAME)
         pygame.display.set_caption("Stage Laser Projection")
-        clock = pygame.time.Clock()
-
-        object_states = None
+        scheduler = FrameScheduler(target_fps)
+
+        renderer = RENDERERS[self.renderer_name]()
+        composer = FrameComposer(renderer)
+        stats = self.frame_stats
+        overlay = StatsOverlay()
+        show_overlay = False
+        measured_arrival = None
+        dt = 0.0
+        compiled = None
+        outgoing = None
+        missing_scene_name = None
+        failed_scene_name = None
 
         # Calculate the center of the screen
-        center_x = self.selected_monitor.width / 2
-        center_y = self.selected_monitor.height / 2
+        center = (self.selected_monitor.width / 2, self.selected_monitor.height / 2)
+
+        preparer = ScenePreparer(lambda scene: self.prepare_scene(scene, renderer, center))
+        preparer.start()
+        outputs = None
+        if self.outputs:
+            outputs = OutputGroup(self.outputs, self.renderer_name)
+            outputs.start()
+            self.output_group = outputs
+            self.log(f"Started {len(self.outputs)} extra outputs: " + ", ".join(output.name for output in self.outputs))
+        if self.osc is not None:
+            self.osc.take()  # Drop commands sent while nothing was projected
+        scheduler.reset()
+        if stats:
+            stats.start()
 
         while self.running:
+            # Remote commands take effect in the frame after they arrive
+            osc = self.osc
+            if osc is not None:
+                for command in osc.take():
+                    try:
+                        self.apply_command(command)
+                    except Exception as e:  # A remote command must never end the show
+                        self.log(f"Error in OSC command {command.address}: {e}")
+
             # Dynamically fetch the current scene
             scene_name = self.current_scene_name
             scene = self.scenes.get(scene_name)
 
             if not scene:
-                self.log(f"Error: Scene '{scene_name}' not found.")
-                self.running = False
-                break
-
-            # Initialize object states if the scene changes
-            if object_states is None or scene_name != getattr(self, "last_scene_name", None):
-                object_states = []
-                for obj in scene["objects"]:
-                    object_states.append({
-                        "obj": obj,
-                        "time": random.uniform(0, 10),  # Randomize start time
-                        "current_pos": None
-                    })
+                if compiled is None:
+                    self.log(f"Error: Scene '{scene_name}' not found.")
+                    self.running = False
+                    break
+                # The file was removed while playing; keep showing what was compiled
+                if scene_name != missing_scene_name:
+                    self.log(f"Scene '{scene_name}' is no longer in the folder, keeping it on screen.")
+                    missing_scene_name = scene_name
+                scene = compiled.scene
+            else:
+                missing_scene_name = None
+
+            # Scene time is taken from the show clock, so a timecode seek moves every object at once
+            show_time = self.show_clock.time()
+            if compiled is None:
+                # Nothing is on screen yet, so compile right away
+                compiled = CompiledScene(scene, log=self.log)
+                cued, self.cue_start = self.cue_start, None
+                scene_start = cued[1] if cued is not None and cued[0] == scene_name else show_time
                 self.last_scene_name = scene_name
+            elif scene is not compiled.scene:
+                # Compile the new scene off this thread and swap it in on the frame it is ready
+                incoming = preparer.take(scene)
+                error = preparer.error(scene)
+                if error is not None:
+                    if scene_name != failed_scene_name:
+                        self.log(f"Could not prepare scene '{scene_name}', keeping the last one on screen: {error}")
+                        failed_scene_name = scene_name
+                elif incoming is None:
+                    preparer.request(scene)
+                else:
+                    fade_mode, fade_duration = self.transition
+                    outgoing = compiled if fade_mode != "cut" and fade_duration > 0 else None
+                    # A cue's scene starts at the cue's show time, however long compiling it took
+                    cued, self.cue_start = self.cue_start, None
+                    outgoing_start = scene_start
+                    scene_start = cued[1] if cued is not None and cued[0] == scene_name else show_time
+                    fade_elapsed = 0.0
+                    compiled = incoming
+                    self.last_scene_name = scene_name
+                    failed_scene_name = None
+            else:
+                # Compile the next cue's scene while this one plays, so it is ready when the cue starts
+                playback = self.playback_thread
+                upcoming = playback.upcoming() if playback is not None else None
+                upcoming = self.scenes.get(upcoming.scene) if upcoming is not None else None
+                if upcoming is not None and upcoming is not scene:
+                    preparer.request(upcoming)
+            # A follower starts the scene when the master did, so objects line up across machines
+            synced = self.synced_start
+            if synced is not None and synced[0] == self.last_scene_name:
+                scene_start = synced[1]
+            self.showing = (self.last_scene_name, scene_start)
+            if stats:
+                stats.lap("scene")
 
             # Clear screen
             screen.fill((0, 0, 0))  # Black background
 
-            # Render objects
-            for state in object_states:
-                obj = state["obj"]
-                t = state["time"]
-                brightness = self.brightness_slider.get() / 255.0
-                speedMultiplier = (self.speed_slider.get() / 128.0) ** 2
-                radiusMultiplier = (self.radius_slider.get() / 128.0) ** 2
-                shift_x = self.x_shift_slider.get() - 128.0
-                shift_y = self.y_shift_slider.get() - 128.0
-                scale = self.scale_slider.get() / 128.0
-
-                try:
-                    if obj["motion"] == "circular":
-                        # Adjust path center to the new coordinate system
-                        center_x_obj = obj["path_center"][0] - center_x
-                        center_y_obj = obj["path_center"][1] - center_y
-                        radius = obj["path_radius"]
-                        angular_velocity = obj["angular_velocity"] * speedMultiplier
-
-                        # Compute position in circular motion
-                        x = center_x_obj + radius * math.cos(t * angular_velocity)
-                        y = center_y_obj + radius * math.sin(t * angular_velocity)
-
-                    elif obj["motion"] == "path":
-                        path = obj["path"]
-                        speed = obj.get("speed", 1) * speedMultiplier
-
-                        total_path_length = len(path) - 1
-                        current_segment = int(t * speed) % total_path_length
-                        next_segment = (current_segment + 1) % len(path)
-
-                        # Adjust path points to the new coordinate system
-                        start_point = (
-                            path[current_segment][0] - center_x,
-                            path[current_segment][1] - center_y
-                        )
-                        end_point = (
-                            path[next_segment][0] - center_x,
-                            path[next_segment][1] - center_y
-                        )
-
-                        progress = (t * speed) % 1
-                        x = start_point[0] + (end_point[0] - start_point[0]) * progress
-                        y = start_point[1] + (end_point[1] - start_point[1]) * progress
-
-                    # Apply scaling and shifting
-                    x = x * scale + shift_x
-                    y = y * scale + shift_y
-
-                    # Convert back to the Pygame coordinate system
-                    current_pos = (int(x + center_x), int(y + center_y))
-
-                    # Draw the object
-                    color = tuple(min(255, int(c * brightness)) for c in obj["color"])
-                    pygame.draw.circle(screen, color, current_pos, int(obj["radius"] * radiusMultiplier))
-                    state["time"] += 0.016  # Roughly 60 FPS
-                    state["current_pos"] = current_pos
-
-                except Exception as e:
-                    self.log(f"Error rendering object: {e}")
+            # Read the laser settings snapshot once per frame
+            parameters, arrival = self.parameters.stamped
+            multipliers = parameters.multipliers()
+
+            # Evaluate all objects at once, then draw them
+            compiled.seek(show_time - scene_start)
+            if outgoing is not None:
+                outgoing.seek(show_time - outgoing_start)
+            frame = compiled.evaluate(center, *multipliers)
+            if stats:
+                stats.lap("update")
+            trail = parameters.trail_half_life() or compiled.trail
+            trailing, outgoing_frame, amount = compiled.trailing, None, 1.0
+            if outgoing is not None:
+                amount = min(1.0, fade_elapsed / fade_duration)
+                if fade_mode == "morph":
+                    frame, trailing = morph_frames(outgoing.evaluate(center, *multipliers), frame, amount), None
+                else:
+                    outgoing_frame, trailing = outgoing.evaluate(center, *multipliers), None
+            if self.blackout:
+                frame, trailing, outgoing_frame, trail = tuple(values[:0] for values in frame), None, None, 0.0
+            if outputs is not None:
+                # Extra outputs draw in their own processes while this one draws too
+                outputs.publish(frame, trailing, dt, trail, outgoing_frame, amount)
+            main_output = self.main_output
+            if outgoing_frame is not None:
+                outgoing_frame = main_output.transform(outgoing_frame)
+            composer.draw(screen, main_output.transform(frame), trailing, dt, trail, outgoing_frame, amount)
+            if main_output.grid:
+                draw_lines(screen, main_output.grid_lines())
+            if stats and (show_overlay or parameters.show_stats()):
+                overlay.draw(screen, stats, stats.last, scheduler.skipped)
+            if stats:
+                stats.lap("draw")
 
             pygame.display.flip()
-            clock.tick(60)
+            if stats:
+                stats.lap("flip")
+                # The first flip showing a received DMX frame ends its latency
+                if arrival is not None and arrival is not measured_arrival:
+                    stats.latency.add(stats.last - arrival.time)
+                    measured_arrival = arrival
+
+            # Trails and fades follow the real time between frames
+            dt = scheduler.tick()
+            if stats:
+                stats.lap("wait")
+            if outgoing is not None:
+                fade_elapsed += dt
+                if fade_elapsed >= fade_duration:
+                    outgoing = None
+            if stats:
+                stats.lap("update")
 
             # Handle Pygame events
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     self.running = False
-
+                elif event.type == pygame.KEYDOWN and event.key == STATS_OVERLAY_KEY:
+                    show_overlay = not show_overlay
+            if stats:
+                stats.lap("events")
+                stats.end_frame()
+
+        if hasattr(renderer, "stats"):
+            self.log("Sprite cache: {sprites} sprites, {hits} hits, {misses} misses, "
+                     "{evictions} evictions.".format(**renderer.stats()))
+        if stats:
+            frame_times = stats.summary().get("frame")
+            if frame_times:
+                self.log("Frame time: {p50:.2f} ms p50, {p95:.2f} ms p95, {p99:.2f} ms p99, ".format(**frame_times)
+                         + f"{scheduler.skipped} frames skipped.")
+            if stats.latency.total:
+                self.log("DMX receive to flip: {p50:.2f} ms p50, {p95:.2f} ms p95, {p99:.2f} ms p99 over ".format(
+                    **stats.latency.percentiles()) + f"{stats.latency.total} frames.")
+                self.log("  " + ", ".join(f"{label}: {count}" for label, count in stats.latency.histogram().items()
+                                          if count))
+        preparer.stop()
+        if outputs is not None:
+            self.output_group = None
+            outputs.stop()
+        self.stop_playback()
         pygame.quit()
 
+    def prepare_scene(self, scene, renderer, center):
+        """Compile a scene and warm the renderer for it; runs on the scene preparer thread."""
+        compiled = CompiledScene(scene, log=self.log)
+        _, radii, colors = compiled.evaluate(center, *self.parameters.current.multipliers())
+        renderer.prepare(radii, colors)
+        return compiled
+
+    def export_stats(self):
+        """Save the frame statistics of the running or last show to a CSV or JSON file."""
+        stats = self.frame_stats
+        if stats is None or not stats.frames:
+            self.log("No frame statistics recorded, check Record frame statistics before starting.")
+            return
+        file_path = filedialog.asksaveasfilename(title="Export Frame Statistics", defaultextension=".csv",
+                                                 filetypes=[("CSV", "*.csv"), ("JSON", "*.json")])
+        if not file_path:
+            return
+        try:
+            stats.export(file_path, renderer=self.renderer_name, target_fps=self.target_fps)
+        except OSError as e:
+            self.log(f"Could not export frame statistics: {e}")
+            return
+        self.log(f"Exported frame statistics to {file_path}.")
+
+    def toggle_latency_test(self):
+        """Start or stop sending test frames to the DMX input to measure latency without a console."""
+        if self.latency_test is not None:
+            self.latency_test.stop()
+            self.latency_test = None
+        if self.latency_test_var.get():
+            self.latency_test = DmxTestSender(self.dmx_input.patch[0], port=self.dmx_input.sacn_port)
+            self.latency_test.start()
+            self.log("DMX latency test started, record frame statistics to see the results.")
+
+    def output_sizes(self):
+        """Return {output name: size} of the outputs that can be calibrated."""
+        monitor = get_monitors()[self.monitor_combobox.current()]
+        sizes = {MAIN_OUTPUT: (monitor.width, monitor.height)}
+        sizes.update((output.name, output.size) for output in self.outputs)
+        return sizes
+
+    def show_corner(self, event=None):
+        """Show the position of the selected corner of the selected output."""
+        name = self.calibration_output_combobox.get()
+        size = self.output_sizes().get(name)
+        if size is None:
+            return
+        corners = self.calibration.get(name, rectangle(size))
+        x, y = corners[self.corner_combobox.current()]
+        self.corner_x_var.set(round(x))
+        self.corner_y_var.set(round(y))
+
+    def move_corner(self, event=None):
+        """Move the selected corner of the selected output to the position in the spinboxes."""
+        name = self.calibration_output_combobox.get()
+        size = self.output_sizes().get(name)
+        try:
+            position = (float(self.corner_x_var.get()), float(self.corner_y_var.get()))
+        except tk.TclError:
+            self.log("Invalid corner position, x and y must be numbers.")
+            return
+        if size is None:
+            return
+        corners = list(self.calibration.get(name, rectangle(size)))
+        corners[self.corner_combobox.current()] = position
+        try:
+            keystone_homography(size, tuple(corners))
+        except ValueError as e:
+            self.log(f"Invalid calibration of {name}: {e}")
+            return
+        self.calibration[name] = tuple(corners)
+        self.apply_calibration()
+
+    def reset_calibration(self):
+        """Remove the keystone correction of the selected output."""
+        self.calibration.pop(self.calibration_output_combobox.get(), None)
+        self.show_corner()
+        self.apply_calibration()
+
+    def save_calibration(self):
+        """Write the calibration of every output next to the scenes."""
+        if not self.scene_folder:
+            self.log("Load a scene folder to save the calibration with it.")
+            return
+        try:
+            file_path = save_calibration(self.scene_folder, self.calibration)
+        except OSError as e:
+            self.log(f"Could not save calibration: {e}")
+            return
+        self.log(f"Saved calibration to {file_path}.")
+
+    def calibrated(self, outputs):
+        """Return outputs with the current calibration and grid setting."""
+        grid = self.grid_var.get()
+        return [output._replace(corners=self.calibration.get(output.name), grid=grid) for output in outputs]
+
+    def apply_calibration(self):
+        """Hand the current calibration to the running outputs."""
+        if self.main_output is not None:
+            self.main_output = self.calibrated([self.main_output])[0]
+        group = self.output_group
+        if group is not None:
+            for index, output in enumerate(self.calibrated(group.outputs)):
+                group.set_output(index, output)
+
+    def toggle_timecode(self):
+        """Start or stop taking scene time from Art-Net timecode."""
+        chasing = self.timecode_var.get()
+        self.show_clock.chase(chasing)
+        self.log("Chasing Art-Net timecode." if chasing else "Scene time runs freely.")
+
+    def change_sync(self, event=None):
+        """Share this machine's show clock as master, follow a master's, or stop syncing."""
+        sync, self.sync = self.sync, None
+        if sync is not None:
+            sync.stop()
+            if isinstance(sync, SyncFollower):
+                self.report_sync(sync)
+        self.synced_start = None
+        mode = self.sync_combobox.get()
+        if mode == "Master":
+            self.sync = SyncMaster(self.show_clock, lambda: self.showing, log=self.log)
+            self.log(f"Sharing the show clock on UDP port {SYNC_PORT}.")
+        elif mode == "Follower":
+            host, _, port = self.sync_master_entry.get().strip().partition(":")
+            try:
+                master = (host or "127.0.0.1", int(port or SYNC_PORT))
+            except ValueError:
+                self.log(f"Invalid sync master: {self.sync_master_entry.get()}")
+                self.sync_combobox.current(0)
+                return
+            self.timecode_var.set(False)  # The master chases timecode for everyone
+            self.sync = SyncFollower(self.show_clock, self.follow_scene, master, log=self.log)
+            self.log(f"Following the show clock of {master[0]}:{master[1]}.")
+            self.root.after(SYNC_REPORT_INTERVAL, self.report_sync, self.sync)
+        if self.sync is not None:
+            self.sync.start()
+
+    def follow_scene(self, name, start):
+        """Show the master's scene from the moment it started there; called by the sync follower."""
+        self.synced_start = (name, start)
+        if name != self.current_scene_name:
+            self.current_scene_name = name
+            self.log(f"Master switched to scene: {name}")
+
+    def report_sync(self, follower):
+        """Log how closely a sync follower keeps to the master, again every SYNC_REPORT_INTERVAL while it runs."""
+        stats = follower.stats()
+        if "offset_ms" not in stats:
+            self.log("Clock sync: no answer from the master yet.")
+        else:
+            self.log("Clock sync: offset {offset_ms:.2f} ms, jitter {jitter_ms:.2f} ms, "
+                     "round trip {round_trip_ms:.2f} ms, error p50 {error_p50_ms:.2f} / p95 {error_p95_ms:.2f} / "
+                     "max {error_max_ms:.2f} ms, {steps} jumps".format(**stats))
+        if follower is self.sync:
+            self.root.after(SYNC_REPORT_INTERVAL, self.report_sync, follower)
+
+    def toggle_osc(self):
+        """Start or stop taking commands from show control software over OSC."""
+        osc, self.osc = self.osc, None
+        if osc is not None:
+            osc.stop()
+            self.log("OSC control stopped.")
+        if self.osc_var.get():
+            try:
+                port = int(self.osc_port_entry.get())
+                if not 0 < port < 65536:
+                    raise ValueError
+            except ValueError:
+                self.log(f"Invalid OSC port: {self.osc_port_entry.get()}")
+                self.osc_var.set(False)
+                return
+            self.osc = OscServer(port, log=self.log)
+            self.osc.start()
+            self.log(f"Listening for OSC on UDP port {port}.")
+
+    def apply_command(self, command):
+        """Carry out an OSC command; runs on the render thread between frames.
+
+        /scene/select takes a scene name or 1-based number, /cue/go an
+        optional cue number, /cue/skip an optional count, /blackout 1 or 0 and
+        /transition a mode and optional seconds. /param/<channel> sets a laser
+        setting, ints as 0-255 DMX values and floats as 0.0-1.0 fader positions.
+        """
+        address, args = command.address, command.args
+        try:
+            if any(isinstance(arg, float) and not math.isfinite(arg) for arg in args):
+                raise ValueError("numbers must be finite")
+            if address == "/scene/select":
+                names = list(self.scenes)
+                name = args[0]
+                if not isinstance(name, str):
+                    name = names[int(name) - 1] if 1 <= int(name) <= len(names) else None
+                if name not in self.scenes:
+                    raise ValueError(f"unknown scene {args[0]!r}")
+                if name != self.current_scene_name:
+                    self.current_scene_name = name
+                    self.log(f"OSC switched to scene: {name}")
+            elif address in ("/cue/go", "/cue/skip"):
+                playback_thread = self.playback_thread
+                if playback_thread is None or not playback_thread.is_alive():
+                    raise ValueError("no cue list is playing")
+                if address == "/cue/go":
+                    playback_thread.go(int(args[0]) if args else None)
+                else:
+                    playback_thread.skip(int(args[0]) if args else 1)
+            elif address == "/blackout":
+                blackout = bool(args[0]) if args else not self.blackout
+                if blackout != self.blackout:
+                    self.blackout = blackout
+                    self.log("OSC blackout on." if blackout else "OSC blackout off.")
+            elif address == "/transition":
+                mode = args[0]
+                duration = float(args[1]) if len(args) > 1 else self.transition[1]
+                if mode not in TRANSITIONS or duration < 0:
+                    raise ValueError(f"invalid transition {args}")
+                self.transition = (mode, duration)
+            elif address.startswith("/param/") and address[7:] in DmxParameters._fields:
+                value = args[0]
+                if isinstance(value, float):
+                    value = value * 255
+                self.parameters.update(**{address[7:]: min(max(round(value), 0), 255)})
+            else:
+                raise ValueError("unknown address")
+        except (IndexError, TypeError, ValueError, OverflowError) as e:
+            self.log(f"Ignoring OSC {' '.join(map(str, (address,) + args))}: {e}")
+
+    def change_transition(self, event=None):
+        """Use the transition settings from the GUI for the next scene change."""
+        try:
+            duration = float(self.fade_spinbox.get())
+            if duration < 0:
+                raise ValueError
+        except ValueError:
+            self.log(f"Invalid transition time: {self.fade_spinbox.get()}")
+            return
+        self.transition = self.mirrored_transition = (self.transition_combobox.get(), duration)
+
     def stop_scene(self):
         """Stop the currently running projection."""
         self.running = False
-        self.playback_active = False
+        self.stop_playback()
         self.log("Projection stopped.")
 
+    def stop_playback(self):
+        """Stop the cue list, if one is playing."""
+        self.playback_active = False
+        playback_thread, self.playback_thread = self.playback_thread, None
+        if playback_thread is not None:
+            playback_thread.stop()
+
     def quit(self):
         """Stop the projection and close the application."""
         self.stop_scene()  # Wait for threads to stop
+        if self.sync is not None:
+            self.sync.stop()
+        if self.osc is not None:
+            self.osc.stop()
         self.root.quit()
 
-    def update_slider(self, brightness, speed, radius, shift_x, shift_y, scale):
-        """Update the brightness slider from Art-Net data."""
-        self.brightness_slider.set(brightness)
-        self.speed_slider.set(speed)
-        self.radius_slider.set(radius)
-        self.x_shift_slider.set(shift_x)
-        self.y_shift_slider.set(shift_y)
-        self.scale_slider.set(scale)
+    def update_slider(self, brightness, speed, radius, shift_x, shift_y, scale, trail=0, stats=0):
+        """Publish laser settings from DMX data; safe to call from any thread."""
+        self.parameters.publish(DmxParameters(brightness, speed, radius, shift_x, shift_y, scale, trail, stats))
+
+    def patch_fixture(self, event=None):
+        """Repatch the projection fixture to the universe and address from the GUI."""
+        try:
+            universe = self.universe_var.get()
+            address = self.address_var.get()
+        except tk.TclError:
+            self.log("Invalid DMX patch, universe and address must be numbers.")
+            return
+        if not (0 <= universe <= 32767 and 1 <= address <= 513 - FIXTURE_CHANNELS):
+            self.log(f"Invalid DMX patch: universe {universe}, address {address}.")
+            return
+        self.dmx_input.set_patch([FixturePatch(universe, address, self.parameters)])
+        self.toggle_latency_test()  # Follow the new patch
+        self.log(f"Patched fixture to universe {universe}, address {address}.")
+
+    def change_merge_mode(self, event=None):
+        """Switch the DMX merge mode used when several sources send the same universe."""
+        mode = self.merge_combobox.get().lower()
+        self.dmx_input.set_merge_mode(mode)
+        self.log(f"DMX merge mode set to {mode.upper()}.")
+
+    def slider_moved(self, name, value):
+        """Publish a laser setting changed by hand on its slider."""
+        value = float(value)
+        # Ignore the callback fired when mirror_parameters moved the slider itself
+        if value != getattr(self.mirrored_parameters, name):
+            self.parameters.update(**{name: value})
+
+    def mirror_parameters(self):
+        """Move the sliders, scene and transition widgets to the latest settings on a throttled Tk timer."""
+        parameters = self.parameters.current
+        if parameters != self.mirrored_parameters:
+            self.mirrored_parameters = parameters
+            self.brightness_slider.set(parameters.brightness)
+            self.speed_slider.set(parameters.speed)
+            self.radius_slider.set(parameters.radius)
+            self.x_shift_slider.set(parameters.shift_x)
+            self.y_shift_slider.set(parameters.shift_y)
+            self.scale_slider.set(parameters.scale)
+            self.trail_slider.set(parameters.trail)
+        # Cues, sync and OSC change the scene and transition from other threads
+        scene_name = self.current_scene_name
+        if scene_name != self.mirrored_scene_name:
+            self.mirrored_scene_name = scene_name
+            if scene_name in self.scenes:
+                self.scene_combobox.set(scene_name)
+        transition = self.transition
+        if transition != self.mirrored_transition:
+            self.mirrored_transition = transition
+            self.transition_combobox.set(transition[0])
+            self.fade_spinbox.delete(0, "end")
+            self.fade_spinbox.insert(0, f"{transition[1]:g}")
+        self.root.after(SLIDER_MIRROR_INTERVAL, self.mirror_parameters)
 
 
 
 import tkinter as tk
 from tkinter import ttk, colorchooser, messagebox
-import json
 
 
 class LiveSceneEditor:
@@ -722,10 +1486,10 @@ def add_live_scene_editing_method(cls):
             self.log("Unable to find current scene.")
             return
 
-        # Create the live scene editor
+        # Create the live scene editor on a plain copy, binary scenes hold NumPy paths
         LiveSceneEditor(self.root,
                         update_callback=self.update_current_scene,
-                        current_scene=current_scene)
+                        current_scene=plain_scene(current_scene))
 
     def update_current_scene(self, updated_scene):
         """Update the current scene in the scenes dictionary."""
@@ -753,6 +1517,7 @@ def add_live_scene_editing_method(cls):
 
 StageLaserProjectionApp = add_live_scene_editing_method(StageLaserProjectionApp)
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Scene loading workers in the packaged executable
     root = tk.Tk()
     app = StageLaserProjectionApp(root)
     root.protocol("WM_DELETE_WINDOW", app.quit())  # Stop scene on close
@@ -0,0 +1,233 @@
+import threading
+import zlib
+
+import numpy as np
+
+# Path animation modes as written by the editors
+ANIMATIONS = {"none": 0, "loop": 1, "bounce": 2}
+
+# Ways to change from one scene to the next
+TRANSITIONS = ("cut", "crossfade", "morph")
+
+
+class CompiledScene:
+    """Struct-of-arrays form of a scene so all objects are evaluated in one batch."""
+
+    def __init__(self, scene, log=None, seed=None):
+        self.scene = scene
+        self.name = scene.get("name", "")
+        log = log or print
+
+        # Trail half-life in seconds, 0 for no trails
+        try:
+            self.trail = max(0.0, float(scene.get("trail", 0)))
+        except (TypeError, ValueError):
+            log(f"Ignoring invalid trail of scene '{self.name}': {scene.get('trail')!r}")
+            self.trail = 0.0
+
+        colors, radii, trailing = [], [], []
+        circular, path = [], []
+        path_centers, path_radii, angular_velocities = [], [], []
+        path_speeds, path_points, path_offsets, segment_counts, path_animations = [], [], [], [], []
+        offset = 0
+
+        for obj in scene.get("objects", []):
+            try:
+                motion = obj["motion"]
+                color = [float(c) for c in obj["color"]][:3]
+                radius = float(obj["radius"])
+                if len(color) != 3:
+                    raise ValueError("color needs three components")
+
+                if motion == "circular":
+                    center = [float(c) for c in obj["path_center"]][:2]
+                    path_centers.append(center)
+                    path_radii.append(float(obj["path_radius"]))
+                    angular_velocities.append(float(obj["angular_velocity"]))
+                    circular.append(len(radii))
+                elif motion == "path":
+                    points = np.asarray(obj["path"])
+                    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 2:
+                        raise ValueError("path needs at least two (x, y) points")
+                    if points.dtype.kind not in "iuf":
+                        raise ValueError("path points must be numbers")
+                    animation = obj.get("animation", "loop")
+                    if animation not in ANIMATIONS:
+                        raise ValueError(f"unknown animation type '{animation}'")
+
+                    path_animations.append(ANIMATIONS[animation])
+                    path_speeds.append(float(obj.get("speed", 1)))
+                    path_points.append(points)
+                    path_offsets.append(offset)
+                    segment_counts.append(len(points) - 1)
+                    offset += len(points)
+                    path.append(len(radii))
+                else:
+                    raise ValueError(f"unknown motion type '{motion}'")
+            except (KeyError, TypeError, ValueError) as e:
+                log(f"Skipping invalid object in scene '{self.name}': {e}")
+                continue
+
+            colors.append(color)
+            radii.append(radius)
+            trailing.append(bool(obj.get("trail", True)))
+
+        self.count = len(radii)
+        self.color = np.array(colors, dtype=np.float64).reshape(-1, 3)
+        self.radius = np.array(radii, dtype=np.float64)
+        # Objects that leave a trail when trails are on; the rest are drawn over it
+        self.trailing = np.array(trailing, dtype=bool)
+
+        # Circular motion parameters
+        self.circular = np.array(circular, dtype=np.intp)
+        self.path_center = np.array(path_centers, dtype=np.float64).reshape(-1, 2)
+        self.path_radius = np.array(path_radii, dtype=np.float64)
+        self.angular_velocity = np.array(angular_velocities, dtype=np.float64)
+
+        # Path motion arc-length tables, all paths packed into one point array
+        self.path = np.array(path, dtype=np.intp)
+        self.path_speed = np.array(path_speeds, dtype=np.float64)
+        self.path_animation = np.array(path_animations, dtype=np.intp)
+        self.path_offset = np.array(path_offsets, dtype=np.intp)
+        self.segment_count = np.array(segment_counts, dtype=np.intp)
+        self.points = np.concatenate(path_points).astype(np.float64) if path_points else np.empty((0, 2))
+
+        # Cumulative arc length of all paths in one increasing table; the step
+        # from one path's last point to the next path's first counts as 1
+        steps = np.hypot(*np.diff(self.points, axis=0).T) if len(self.points) else np.empty(0)
+        steps[self.path_offset[1:] - 1] = 1.0
+        self.arc_length = np.concatenate(([0.0], np.cumsum(steps)))[:len(self.points)]
+        self.path_base = self.arc_length[self.path_offset]
+        self.path_length = self.arc_length[self.path_offset + self.segment_count] - self.path_base
+
+        # Every object runs on the same clock, so per-object time is phase + elapsed. Phases come
+        # from the scene's seed, its name by default, so a scene looks the same every time it is shown
+        if seed is None:
+            seed = scene.get("seed")
+        if not isinstance(seed, int) or seed < 0:
+            seed = zlib.crc32(self.name.encode("utf-8"))
+        self.phase = np.random.default_rng(seed).uniform(0, 10, self.count)
+        # Paths that play once start from their first point
+        self.phase[self.path[self.path_animation == ANIMATIONS["none"]]] = 0.0
+        self.elapsed = 0.0
+
+    def advance(self, dt):
+        """Advance the scene time by dt seconds."""
+        self.elapsed += dt
+
+    def seek(self, elapsed):
+        """Set the scene time; positions depend on it alone, so any time can be shown at once."""
+        self.elapsed = elapsed
+
+    def evaluate(self, center, brightness=1.0, speed=1.0, radius=1.0, shift=(0.0, 0.0), scale=1.0):
+        """Return screen positions, radii and dimmed colors for every object."""
+        t = self.phase + self.elapsed
+        center = np.asarray(center, dtype=np.float64)
+        positions = np.empty((self.count, 2), dtype=np.float64)
+
+        if len(self.circular):
+            angle = t[self.circular] * (self.angular_velocity * speed)
+            positions[self.circular, 0] = self.path_center[:, 0] + self.path_radius * np.cos(angle)
+            positions[self.circular, 1] = self.path_center[:, 1] + self.path_radius * np.sin(angle)
+
+        if len(self.path):
+            positions[self.path] = self.path_positions(t[self.path] * speed)
+
+        # Scale around the screen center, then shift
+        positions = (positions - center) * scale + np.asarray(shift, dtype=np.float64) + center
+        positions = np.trunc(positions).astype(np.intp)
+        radii = np.trunc(self.radius * radius).astype(np.intp)
+        colors = np.minimum(255, np.trunc(self.color * brightness)).astype(np.intp)
+        return positions, radii, colors
+
+    def path_positions(self, t):
+        """Return constant-velocity positions along every path at scaled time t."""
+        # Speed counts segments per second, so a full pass keeps its legacy duration
+        progress = t * self.path_speed / self.segment_count
+        fraction = np.where(
+            self.path_animation == ANIMATIONS["loop"], np.mod(progress, 1.0),
+            np.where(self.path_animation == ANIMATIONS["bounce"],
+                     1.0 - np.abs(np.mod(progress, 2.0) - 1.0),
+                     np.clip(progress, 0.0, 1.0)))
+        distance = self.path_base + fraction * self.path_length
+
+        # Binary search the packed arc-length table for each object's segment
+        index = np.searchsorted(self.arc_length, distance, side="right") - 1
+        index = np.clip(index, self.path_offset, self.path_offset + self.segment_count - 1)
+        segment_start = self.arc_length[index]
+        segment_length = self.arc_length[index + 1] - segment_start
+        within = np.divide(distance - segment_start, segment_length,
+                           out=np.zeros_like(distance), where=segment_length > 0)
+
+        start = self.points[index]
+        end = self.points[index + 1]
+        return start + (end - start) * within[:, None]
+
+
+def morph_frames(outgoing, incoming, amount):
+    """Blend two evaluated frames into one, amount 0 showing outgoing and 1 incoming.
+
+    Objects move, resize and recolor into the object with the same index in
+    the incoming frame; objects without a partner fade out or in.
+    """
+    (out_positions, out_radii, out_colors), (in_positions, in_radii, in_colors) = outgoing, incoming
+    count = min(len(out_radii), len(in_radii))
+
+    def mix(start, end):
+        return np.trunc(start[:count] + (end[:count] - start[:count]) * amount).astype(np.intp)
+
+    return (np.concatenate((mix(out_positions, in_positions), out_positions[count:], in_positions[count:])),
+            np.concatenate((mix(out_radii, in_radii), out_radii[count:], in_radii[count:])),
+            np.concatenate((mix(out_colors, in_colors),
+                            np.trunc(out_colors[count:] * (1.0 - amount)).astype(np.intp),
+                            np.trunc(in_colors[count:] * amount).astype(np.intp))))
+
+
+class ScenePreparer(threading.Thread):
+    """Compiles scenes on a background thread so the render thread only swaps them in.
+
+    prepare(scene) returns the compiled scene; it can also warm caches for it.
+    Only the latest requested scene is prepared, earlier requests are dropped.
+    If prepare() raises, the error is kept for the render thread to report and
+    the thread waits for the next request.
+    """
+
+    def __init__(self, prepare):
+        super().__init__(daemon=True)
+        self.prepare = prepare
+        self.wanted = None
+        self.prepared = (None, None, None)  # Scene, compiled scene and the error preparing it
+        self.wake = threading.Event()
+        self.stopped = False
+
+    def request(self, scene):
+        """Start preparing a scene unless it is already wanted."""
+        if scene is not self.wanted:
+            self.wanted = scene
+            self.wake.set()
+
+    def take(self, scene):
+        """Return the compiled scene if it is ready, otherwise None."""
+        prepared_scene, compiled, _ = self.prepared
+        return compiled if prepared_scene is scene else None
+
+    def error(self, scene):
+        """Return the exception raised preparing the scene, or None."""
+        prepared_scene, _, error = self.prepared
+        return error if prepared_scene is scene else None
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if self.stopped:
+                return
+            scene = self.wanted
+            try:
+                self.prepared = (scene, self.prepare(scene), None)
+            except Exception as e:  # A broken scene file must not stop later scene changes
+                self.prepared = (scene, None, e)
@@ -0,0 +1,187 @@
+import asyncio
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+# UDP port OSC commands are received on
+OSC_PORT = 8000
+
+# Commands kept when the render loop is not taking them, e.g. while nothing is projected
+QUEUE_LIMIT = 256
+
+BUNDLE = b"#bundle\0"
+
+
+class Command(namedtuple("Command", "address args received")):
+    """An OSC message and the perf_counter() time it was received."""
+    __slots__ = ()
+
+
+def _padded(length):
+    return (length + 4) & ~3
+
+
+def _string(data, offset):
+    """Return a NUL-terminated, 4-byte padded OSC string and the offset after it."""
+    end = data.find(b"\0", offset)
+    if end < 0:
+        raise ValueError("unterminated string")
+    return data[offset:end].decode("utf-8"), offset + _padded(end - offset)
+
+
+def parse_message(data):
+    """Return (address, args) of an OSC message; raises ValueError if it is malformed."""
+    try:
+        address, offset = _string(data, 0)
+        if not address.startswith("/"):
+            raise ValueError(f"invalid address '{address}'")
+        if offset >= len(data):
+            return address, ()  # Old senders leave out an empty type tag string
+        tags, offset = _string(data, offset)
+        if not tags.startswith(","):
+            raise ValueError("missing type tags")
+        args = []
+        for tag in tags[1:]:
+            if tag == "i":
+                args.append(struct.unpack_from(">i", data, offset)[0])
+                offset += 4
+            elif tag == "f":
+                args.append(struct.unpack_from(">f", data, offset)[0])
+                offset += 4
+            elif tag == "d":
+                args.append(struct.unpack_from(">d", data, offset)[0])
+                offset += 8
+            elif tag == "h":
+                args.append(struct.unpack_from(">q", data, offset)[0])
+                offset += 8
+            elif tag == "s":
+                value, offset = _string(data, offset)
+                args.append(value)
+            elif tag == "b":
+                (length,) = struct.unpack_from(">i", data, offset)
+                args.append(bytes(data[offset + 4:offset + 4 + length]))
+                offset += 4 + (length + 3 & ~3)
+            elif tag in "TF":
+                args.append(tag == "T")
+            elif tag == "N":
+                args.append(None)
+            else:
+                raise ValueError(f"unsupported type tag '{tag}'")
+        if offset > len(data):
+            raise ValueError("arguments are cut off")
+        return address, tuple(args)
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(str(e)) from None
+
+
+def parse_packet(data):
+    """Return every (address, args) of an OSC packet, unpacking bundles in order.
+
+    Bundle time tags are ignored; the messages are applied on arrival.
+    """
+    if not data.startswith(BUNDLE):
+        return [parse_message(data)]
+    messages = []
+    offset = len(BUNDLE) + 8  # Time tag
+    while offset + 4 <= len(data):
+        (length,) = struct.unpack_from(">i", data, offset)
+        offset += 4
+        if length <= 0 or offset + length > len(data):
+            raise ValueError("bundle element is cut off")
+        messages += parse_packet(data[offset:offset + length])
+        offset += length
+    return messages
+
+
+def message(address, *args):
+    """Return an OSC message of int, float and str arguments, e.g. to test a server."""
+    def string(value):
+        encoded = value.encode("utf-8")
+        return encoded + b"\0" * (_padded(len(encoded)) - len(encoded))
+
+    tags, values = ",", b""
+    for arg in args:
+        if isinstance(arg, bool) or not isinstance(arg, (int, float, str)):
+            raise TypeError(f"unsupported OSC argument {arg!r}")
+        if isinstance(arg, int):
+            tags, values = tags + "i", values + struct.pack(">i", arg)
+        elif isinstance(arg, float):
+            tags, values = tags + "f", values + struct.pack(">f", arg)
+        else:
+            tags, values = tags + "s", values + string(arg)
+    return string(address) + string(tags) + values
+
+
+class _Protocol(asyncio.DatagramProtocol):
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.received(data, addr)
+
+
+class OscServer(threading.Thread):
+    """Receives OSC commands over UDP for the render loop.
+
+    An asyncio datagram endpoint runs on this thread's own event loop and
+    only parses packets and appends Commands to commands, a bounded deque:
+    appending and popleft() are atomic, so the render loop takes them once
+    per frame without a lock and nothing waits for Tk.
+    """
+
+    def __init__(self, port=OSC_PORT, bind_address="0.0.0.0", log=print, clock=time.perf_counter):
+        super().__init__(daemon=True)
+        self.port = port
+        self.bind_address = bind_address
+        self.log = log
+        self.clock = clock
+        self.commands = deque(maxlen=QUEUE_LIMIT)
+        self.loop = None
+        self.stopped = False
+        self.ready = threading.Event()
+
+    def received(self, data, addr):
+        received = self.clock()
+        try:
+            messages = parse_packet(data)
+        except ValueError as e:
+            self.log(f"Ignoring OSC packet from {addr[0]}: {e}")
+            return
+        for address, args in messages:
+            self.commands.append(Command(address, args, received))
+
+    def take(self):
+        """Return the commands received since the last call, oldest first."""
+        commands = []
+        while True:
+            try:
+                commands.append(self.commands.popleft())
+            except IndexError:
+                return commands
+
+    def stop(self):
+        self.stopped = True
+        loop = self.loop
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            transport, _ = loop.run_until_complete(loop.create_datagram_endpoint(
+                lambda: _Protocol(self), local_addr=(self.bind_address, self.port)))
+        except OSError as e:
+            self.log(f"OSC server error: {e}")
+            loop.close()
+            self.ready.set()
+            return
+        self.loop = loop
+        self.ready.set()
+        try:
+            if not self.stopped:  # Unless stop() came before there was a loop to stop
+                loop.run_forever()
+        finally:
+            transport.close()
+            loop.run_until_complete(asyncio.sleep(0))
+            loop.close()
@@ -0,0 +1,276 @@
+import json
+import multiprocessing
+import os
+import queue
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from keystone import grid_lines, keystone_homography, warp
+
+# Extra outputs kept next to the scenes in a scene folder
+OUTPUT_FILE = "outputs.json"
+
+# Seconds an output waits for a frame before handling its window events anyway
+FRAME_TIMEOUT = 0.1
+
+
+class Output(namedtuple("Output", "name position size offset scale blackout corners grid",
+                        defaults=(None, False))):
+    """A projector window: desktop position and size, and the part of the show it shows.
+
+    Show coordinates are those of the main projection. An output shows them
+    shifted by -offset and multiplied by scale, so an output with offset
+    (1920, 0) continues a 1920 px wide main projection to the right.
+    corners, if set, are where the output's top left, top right, bottom
+    right and bottom left corners should land to undo the projector's
+    keystone. grid shows the calibration grid.
+    """
+    __slots__ = ()
+
+    def transform(self, frame):
+        """Return an evaluated frame in this output's pixels."""
+        positions, radii, colors = frame
+        if self.offset == (0, 0) and self.scale == 1 and self.corners is None:
+            return frame
+        if self.offset != (0, 0) or self.scale != 1:
+            positions = (positions - np.asarray(self.offset)) * self.scale
+            radii = radii * self.scale
+        if self.corners is not None:
+            positions, radii = warp(keystone_homography(self.size, self.corners), positions, radii)
+        return np.trunc(positions).astype(np.intp), np.trunc(radii).astype(np.intp), colors
+
+    def grid_lines(self):
+        """Return the calibration grid lines in this output's pixels."""
+        return grid_lines(self.size, self.corners)
+
+
+def load_output_list(file_path, monitors):
+    """Read an output list file and return its Outputs.
+
+    The file holds {"outputs": [{"monitor": 2, "offset": [1920, 0]}, ...]}
+    with 1-based monitor numbers as in the GUI. "size" defaults to the
+    monitor's resolution, "offset" to [0, 0], "scale" to 1 and "blackout" to
+    false.
+    """
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Could not read output list {file_path}: {e}") from e
+
+    try:
+        outputs = []
+        for number, entry in enumerate(data["outputs"], 1):
+            monitor = int(entry["monitor"])
+            if not 1 <= monitor <= len(monitors):
+                raise ValueError(f"output {number} uses unknown monitor {monitor}")
+            monitor = monitors[monitor - 1]
+            width, height = (int(side) for side in entry.get("size", (monitor.width, monitor.height)))
+            offset_x, offset_y = (float(value) for value in entry.get("offset", (0, 0)))
+            scale = float(entry.get("scale", 1))
+            if width <= 0 or height <= 0 or scale <= 0:
+                raise ValueError(f"output {number} needs a positive size and scale")
+            outputs.append(Output(entry.get("name", f"Output {number + 1}"), (monitor.x, monitor.y),
+                                  (width, height), (offset_x, offset_y), scale, bool(entry.get("blackout", False))))
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid output list {file_path}: {e}") from e
+    return outputs
+
+
+def folder_output_list(folder, monitors):
+    """Return the folder's extra outputs, or none without an output list."""
+    file_path = os.path.join(folder, OUTPUT_FILE) if folder else None
+    if file_path and os.path.exists(file_path):
+        return load_output_list(file_path, monitors)
+    return []
+
+
+class FrameBlock:
+    """One evaluated frame, and the outgoing frame of a crossfade, in shared memory.
+
+    The writer makes the sequence number odd while it writes and even when
+    done, and readers retry a copy that saw it change, so they never get a
+    half-written frame without taking a lock.
+    """
+
+    # int64 sequence, count, outgoing count; float64 dt, trail, amount
+    HEADER = 48
+
+    def __init__(self, capacity, name=None):
+        self.capacity = capacity
+        size = self.HEADER + capacity * (2 * (2 * 4 + 4 + 3) + 1)
+        self.memory = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.name = self.memory.name
+
+        buffer = self.memory.buf
+        self.counters = np.ndarray(3, np.int64, buffer)
+        self.values = np.ndarray(3, np.float64, buffer, 24)
+        offset = self.HEADER
+        self.frames = []
+        for _ in range(2):
+            positions = np.ndarray((capacity, 2), np.int32, buffer, offset)
+            radii = np.ndarray(capacity, np.int32, buffer, offset + capacity * 8)
+            colors = np.ndarray((capacity, 3), np.uint8, buffer, offset + capacity * 12)
+            self.frames.append((positions, radii, colors))
+            offset += capacity * 15
+        self.trailing = np.ndarray(capacity, np.bool_, buffer, offset)
+
+    def write(self, frame, trailing=None, dt=0.0, trail=0.0, outgoing=None, amount=1.0):
+        """Publish a frame; it must hold no more than capacity objects."""
+        counters = self.counters
+        counters[0] += 1
+        count = len(frame[1])
+        for target, values in zip(self.frames[0], frame):
+            target[:count] = values
+        if outgoing is not None:
+            for target, values in zip(self.frames[1], outgoing):
+                target[:len(outgoing[1])] = values
+        self.trailing[:count] = True if trailing is None else trailing
+        counters[1] = count
+        counters[2] = -1 if outgoing is None else len(outgoing[1])
+        self.values[:] = (dt, trail or 0.0, amount)
+        counters[0] += 1
+
+    def read(self, last=0):
+        """Return (sequence, frame, trailing, dt, trail, outgoing, amount), or None without a new frame."""
+        counters = self.counters
+        while True:
+            sequence = int(counters[0])
+            if sequence == last or sequence % 2:
+                return None
+            count, outgoing_count = int(counters[1]), int(counters[2])
+            frame = tuple(values[:count].astype(np.intp) for values in self.frames[0])
+            outgoing = None
+            if outgoing_count >= 0:
+                outgoing = tuple(values[:outgoing_count].astype(np.intp) for values in self.frames[1])
+            trailing = self.trailing[:count].copy()
+            dt, trail, amount = self.values.tolist()
+            if int(counters[0]) == sequence:
+                return sequence, frame, trailing, dt, trail, outgoing, amount
+
+    def close(self):
+        # Views must go before the mapping can be closed
+        self.counters = self.values = self.frames = self.trailing = None
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
+
+
+def run_output(output, block_name, capacity, renderer_name, control, wake, driver=None):
+    """Show the frames of a FrameBlock in a window; runs in an output process."""
+    if driver:
+        os.environ["SDL_VIDEODRIVER"] = driver
+    os.environ["SDL_VIDEO_WINDOW_POS"] = "{},{}".format(*output.position)
+    import pygame
+
+    from render import RENDERERS, FrameComposer, draw_lines
+
+    pygame.display.init()
+    screen = pygame.display.set_mode(output.size, pygame.NOFRAME)
+    pygame.display.set_caption(f"Stage Laser Projection - {output.name}")
+    composer = FrameComposer(RENDERERS[renderer_name]())
+    block = FrameBlock(capacity, block_name)
+    sequence = 0
+    try:
+        while True:
+            try:
+                message = control.get_nowait()
+            except queue.Empty:
+                message = None
+            if message is not None:
+                kind, value = message
+                if kind == "stop":
+                    break
+                if kind == "block":
+                    block.close()
+                    block = FrameBlock(*value)
+                    sequence = 0
+                elif kind == "output":
+                    output = value
+                continue
+
+            if wake.wait(FRAME_TIMEOUT):
+                wake.clear()
+                frame = block.read(sequence)
+                if frame is not None:
+                    sequence, positions, trailing, dt, trail, outgoing, amount = frame
+                    screen.fill((0, 0, 0))
+                    if output.blackout:
+                        composer.trails.reset()
+                    else:
+                        if outgoing is not None:
+                            outgoing = output.transform(outgoing)
+                        composer.draw(screen, output.transform(positions), trailing, dt, trail, outgoing, amount)
+                    if output.grid:
+                        draw_lines(screen, output.grid_lines())
+                    pygame.display.flip()
+            pygame.event.pump()
+    finally:
+        block.close()
+        pygame.quit()
+
+
+class OutputGroup:
+    """Output processes showing the frames published by the render loop.
+
+    Each output renders in its own process from one FrameBlock written once
+    per frame, so outputs draw in parallel instead of taking turns in the
+    render thread. The block is replaced by a larger one when a scene has
+    more objects than it holds.
+    """
+
+    def __init__(self, outputs, renderer_name, capacity=1024, driver=None):
+        self.outputs = list(outputs)
+        self.renderer_name = renderer_name
+        self.driver = driver
+        self.context = multiprocessing.get_context("spawn")
+        self.block = FrameBlock(capacity)
+        self.retired = []
+        self.controls = [self.context.Queue() for _ in self.outputs]
+        self.wakes = [self.context.Event() for _ in self.outputs]
+        self.processes = []
+
+    def start(self):
+        for output, control, wake in zip(self.outputs, self.controls, self.wakes):
+            process = self.context.Process(
+                target=run_output, daemon=True, name=output.name,
+                args=(output, self.block.name, self.block.capacity, self.renderer_name, control, wake, self.driver))
+            process.start()
+            self.processes.append(process)
+
+    def publish(self, frame, trailing=None, dt=0.0, trail=0.0, outgoing=None, amount=1.0):
+        """Hand a frame to every output."""
+        count = max(len(frame[1]), 0 if outgoing is None else len(outgoing[1]))
+        if count > self.block.capacity:
+            self.resize(max(count, 2 * self.block.capacity))
+        self.block.write(frame, trailing, dt, trail, outgoing, amount)
+        for wake in self.wakes:
+            wake.set()
+
+    def resize(self, capacity):
+        """Move to a larger block; outputs switch over before their next frame."""
+        old, self.block = self.block, FrameBlock(capacity)
+        for control in self.controls:
+            control.put(("block", (self.block.capacity, self.block.name)))
+        # Kept until stop(), an output that has not started yet still opens it first
+        old.close()
+        self.retired.append(old)
+
+    def set_output(self, index, output):
+        """Change an output's offset, scale, blackout or calibration while it runs."""
+        self.outputs[index] = output
+        self.controls[index].put(("output", output))
+
+    def stop(self, timeout=2.0):
+        for control in self.controls:
+            control.put(("stop", None))
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.block.close()
+        for block in self.retired + [self.block]:
+            block.unlink()
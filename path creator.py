@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import json
-import base64
+
+from scenes import plain_scene, read_scene_file, save_scene_file
 
 
 class PathJsonCreator:
@@ -17,6 +17,10 @@ class PathJsonCreator:
         self.save_button = tk.Button(root, text="Save spyLAZ", command=self.save_file)
         self.save_button.grid(row=0, column=1, padx=10, pady=10)
 
+        self.legacy_var = tk.BooleanVar(value=False)
+        self.legacy_checkbox = tk.Checkbutton(root, text="Save as legacy Base64 JSON", variable=self.legacy_var)
+        self.legacy_checkbox.grid(row=0, column=2, padx=10, pady=10)
+
         # Object properties
         self.add_object_label = tk.Label(root, text="Add/Edit Object")
         self.add_object_label.grid(row=1, column=0, padx=10, pady=5, columnspan=2)
@@ -164,17 +168,14 @@ class PathJsonCreator:
         )
         if file_path:
             try:
-                with open(file_path, "rb") as file:
-                    encoded_data = file.read()
-                    decoded_data = base64.b64decode(encoded_data).decode("utf-8")
-                    data = json.loads(decoded_data)
-                    self.objects = data.get("objects", [])
-                    self.name_entry.delete(0, tk.END)
-                    self.name_entry.insert(0, data.get("name", ""))
-                    self.object_listbox.delete(0, tk.END)
-                    for obj in self.objects:
-                        self.object_listbox.insert(tk.END, f"Object: {obj}")
-                    messagebox.showinfo("Success", "spyLAZ file loaded successfully!")
+                data = plain_scene(read_scene_file(file_path))
+                self.objects = data.get("objects", [])
+                self.name_entry.delete(0, tk.END)
+                self.name_entry.insert(0, data.get("name", ""))
+                self.object_listbox.delete(0, tk.END)
+                for obj in self.objects:
+                    self.object_listbox.insert(tk.END, f"Object: {obj}")
+                messagebox.showinfo("Success", "spyLAZ file loaded successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to load spyLAZ file: {e}")
 
@@ -194,10 +195,7 @@ class PathJsonCreator:
                     "name": self.name_entry.get(),
                     "objects": self.objects
                 }
-                json_data = json.dumps(scene, indent=4)
-                encoded_data = base64.b64encode(json_data.encode("utf-8"))
-                with open(file_path, "wb") as file:
-                    file.write(encoded_data)
+                save_scene_file(file_path, scene, legacy=self.legacy_var.get())
                 messagebox.showinfo("Success", f"Scene saved to {file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save spyLAZ file: {e}")
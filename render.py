@@ -0,0 +1,453 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+
+def draw_circles(screen, positions, radii, colors):
+    """Draw every object with its own pygame.draw.circle call."""
+    for pos, radius, color in zip(positions.tolist(), radii.tolist(), colors.tolist()):
+        pygame.draw.circle(screen, color, pos, radius)
+
+
+def draw_lines(screen, lines, color=(255, 255, 255)):
+    """Draw straight ((x1, y1), (x2, y2)) lines, e.g. a calibration grid."""
+    for start, end in lines:
+        pygame.draw.line(screen, color, start, end)
+
+
+class CircleRenderer:
+    """Draws every object with its own pygame.draw.circle call."""
+
+    def draw(self, screen, positions, radii, colors):
+        """Draw one frame of evaluated objects."""
+        draw_circles(screen, positions, radii, colors)
+
+    def prepare(self, radii, colors):
+        """Nothing to warm up for direct drawing."""
+
+
+class SpriteRenderer:
+    """Draws objects from pre-rasterized circle sprites in one Surface.blits batch.
+
+    Sprites are keyed by quantized radius and color and kept in an LRU cache
+    bounded by sprite count and total pixels. Radii up to 32 px are exact;
+    larger ones snap to steps of about 3%, and color channels snap to
+    multiples of color_step, so continuous DMX fades reuse sprites instead of
+    rasterizing new ones every frame. Frames needing more distinct sprites
+    than the cache holds are drawn directly rather than thrashing it.
+    prepare() can fill the cache from another thread before a scene is shown.
+    """
+
+    def __init__(self, max_sprites=2048, max_pixels=32 * 1024 * 1024, color_step=4, antialias=False,
+                 supersample=4):
+        self.max_sprites = max_sprites
+        self.max_pixels = max_pixels
+        self.color_step = color_step
+        self.antialias = antialias
+        self.supersample = supersample
+        self.sprites = OrderedDict()
+        self.pixels = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fallbacks = 0
+        self.lock = threading.Lock()
+
+    def stats(self):
+        """Return the cache counters."""
+        return {"sprites": len(self.sprites), "pixels": self.pixels, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "fallbacks": self.fallbacks}
+
+    def draw(self, screen, positions, radii, colors):
+        """Draw one frame of evaluated objects."""
+        visible = radii >= 1
+        if not visible.all():
+            positions, radii, colors = positions[visible], radii[visible], colors[visible]
+        if not len(radii):
+            return
+
+        quantized = quantize_radius(radii)
+        keys = self.keys(quantized, colors)
+
+        # Look every distinct sprite up once, then fan out to the objects using it
+        unique, inverse = np.unique(keys, return_inverse=True)
+        if len(unique) > self.max_sprites:
+            self.fallbacks += 1
+            draw_circles(screen, positions, radii, colors)
+            return
+        radii = quantized
+        sprites = np.empty(len(unique), dtype=object)
+        with self.lock:
+            sprites[:] = [self.sprite(int(key)) for key in unique]
+        topleft = (positions - radii[:, None]).tolist()
+        screen.blits(zip(sprites[inverse.ravel()].tolist(), topleft), doreturn=False)
+
+    def prepare(self, radii, colors):
+        """Rasterize the sprites a frame of objects will need, one at a time so drawing is not held up."""
+        visible = radii >= 1
+        unique = np.unique(self.keys(quantize_radius(radii[visible]), colors[visible]))
+        if len(unique) > self.max_sprites:
+            return
+        for key in unique.tolist():
+            with self.lock:
+                if key not in self.sprites:
+                    self.sprite(key)
+
+    def keys(self, quantized_radii, colors):
+        """Return the cache key of every object."""
+        step = self.color_step
+        quantized_colors = np.minimum(255, (colors + step // 2) // step * step)
+        return ((quantized_radii.astype(np.int64) << 24) | (quantized_colors[:, 0] << 16)
+                | (quantized_colors[:, 1] << 8) | quantized_colors[:, 2])
+
+    def sprite(self, key):
+        """Return the cached sprite for a key, rasterizing it on a miss."""
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+            return sprite
+
+        self.misses += 1
+        radius = key >> 24
+        color = ((key >> 16) & 0xFF, (key >> 8) & 0xFF, key & 0xFF)
+        sprite = self.rasterize(radius, color)
+        self.sprites[key] = sprite
+        self.pixels += 4 * radius * radius
+        # Always keep the newest sprite, even if it alone exceeds the pixel budget
+        while len(self.sprites) > 1 and (len(self.sprites) > self.max_sprites or self.pixels > self.max_pixels):
+            _, evicted = self.sprites.popitem(last=False)
+            self.pixels -= evicted.get_width() * evicted.get_height()
+            self.evictions += 1
+        return sprite
+
+    def rasterize(self, radius, color):
+        """Draw a circle sprite covering the same pixels as pygame.draw.circle."""
+        size = 2 * radius
+        if self.antialias:
+            # Draw large and scale down; transparent pixels share the color so edges do not darken
+            big = pygame.Surface((size * self.supersample, size * self.supersample), pygame.SRCALPHA)
+            big.fill(color + (0,))
+            pygame.draw.circle(big, color, (radius * self.supersample,) * 2, radius * self.supersample)
+            sprite = pygame.transform.smoothscale(big, (size, size))
+            return sprite.convert_alpha() if pygame.display.get_surface() else sprite
+
+        sprite = pygame.Surface((size, size))
+        if pygame.display.get_surface():
+            sprite = sprite.convert()
+        key_color = (0, 0, 0) if color != (0, 0, 0) else (255, 255, 255)
+        sprite.fill(key_color)
+        pygame.draw.circle(sprite, color, (radius, radius), radius)
+        sprite.set_colorkey(key_color, pygame.RLEACCEL)
+        return sprite
+
+
+class Crossfader:
+    """Mixes two frames by blending a copy of the whole incoming frame over the outgoing one.
+
+    Objects are drawn at full brightness and the frames are weighted by one
+    alpha blit, so a fade does not need new sprites on every frame. Sprites
+    are only ever drawn onto the screen: blitting them onto another surface
+    in between would make SDL map (and RLE-encode) each of them again.
+    """
+
+    def __init__(self):
+        self.layer = None
+
+    def draw(self, screen, renderer, outgoing, incoming, amount):
+        """Draw incoming at amount and outgoing at 1 - amount onto a black screen."""
+        renderer.draw(screen, *incoming)
+        if self.layer is None or self.layer.get_size() != screen.get_size():
+            self.layer = screen.copy()
+        else:
+            self.layer.blit(screen, (0, 0))
+        self.layer.set_alpha(round(255 * min(max(amount, 0.0), 1.0)))
+
+        screen.fill((0, 0, 0))
+        renderer.draw(screen, *outgoing)
+        screen.blit(self.layer, (0, 0))
+
+
+class TrailBuffer:
+    """Persistent copy of the drawn frames that fades a little every frame.
+
+    Each frame is combined with the faded copy by taking the brighter pixel,
+    so trails cost a fixed few full-screen blits however long they are. 8-bit
+    multiplies round up and would stall on dim pixels, so every fade also
+    subtracts one step, and fades too small to represent wait until enough
+    time has passed.
+    """
+
+    def __init__(self):
+        self.buffer = None
+        self.fade = None
+        self.step = None
+        self.level = None
+        self.pending = 0.0
+
+    def reset(self):
+        """Drop the trails, e.g. when they are switched off."""
+        self.buffer = None
+
+    def apply(self, screen, dt, half_life):
+        """Add the faded trails to what is on the screen, then remember the result."""
+        if self.buffer is None or self.buffer.get_size() != screen.get_size():
+            self.buffer = screen.copy()
+            self.fade = screen.copy()
+            self.step = screen.copy()
+            self.step.fill((1, 1, 1))
+            self.level = None
+            self.pending = 0.0
+            return
+
+        self.pending += dt
+        level = int(256 * 0.5 ** (self.pending / half_life))
+        if level < 255:
+            if level != self.level:
+                self.fade.fill((level,) * 3)
+                self.level = level
+            self.buffer.blit(self.fade, (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+            self.buffer.blit(self.step, (0, 0), special_flags=pygame.BLEND_RGB_SUB)
+            self.pending = 0.0
+        screen.blit(self.buffer, (0, 0), special_flags=pygame.BLEND_RGB_MAX)
+        self.buffer.blit(screen, (0, 0))
+
+
+class FrameComposer:
+    """Draws evaluated frames with trails and crossfades onto one output.
+
+    Every output has its own composer, as the crossfade layer and trail
+    buffer hold pixels of that output.
+    """
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.crossfader = Crossfader()
+        self.trails = TrailBuffer()
+
+    def draw(self, screen, frame, trailing=None, dt=0.0, trail=0.0, outgoing=None, amount=1.0):
+        """Draw a frame onto a black screen.
+
+        trailing masks the objects that leave a trail, None for all of them.
+        With an outgoing frame the two are crossfaded by amount.
+        """
+        renderer = self.renderer
+        if outgoing is not None:
+            self.crossfader.draw(screen, renderer, outgoing, frame, amount)
+            if trail:
+                self.trails.apply(screen, dt, trail)
+        elif trail and trailing is not None and not trailing.all():
+            # Objects without a trail are drawn over the trails instead of leaving one
+            renderer.draw(screen, *(values[trailing] for values in frame))
+            self.trails.apply(screen, dt, trail)
+            renderer.draw(screen, *(values[~trailing] for values in frame))
+        else:
+            renderer.draw(screen, *frame)
+            if trail:
+                self.trails.apply(screen, dt, trail)
+        if not trail:
+            self.trails.reset()
+
+
+class StatsOverlay:
+    """Frame time percentiles drawn in a corner of the screen.
+
+    Rendering text is slow, so the text is only redrawn every interval
+    seconds and blitted from a cached surface in between.
+    """
+
+    def __init__(self, interval=0.5, size=18, color=(255, 255, 255), background=(0, 0, 0, 160)):
+        self.interval = interval
+        self.size = size
+        self.color = color
+        self.background = background
+        self.font = None
+        self.surface = None
+        self.updated = None
+
+    def draw(self, screen, stats, now, skipped=0):
+        """Blit the overlay, refreshing its text from the frame stats when it is due."""
+        if self.surface is None or now - self.updated >= self.interval:
+            self.surface = self.render(stats.summary(), len(stats.samples()), skipped, stats.latency.percentiles())
+            self.updated = now
+        screen.blit(self.surface, (10, 10))
+
+    def render(self, summary, frames, skipped, latency=None):
+        """Draw the text of a stats summary and DMX latency percentiles onto a new surface."""
+        if self.font is None:
+            pygame.font.init()
+            self.font = pygame.font.SysFont("monospace", self.size)
+        lines = [f"{'stage':<7} {'p50':>7} {'p95':>7} {'p99':>7} ms"]
+        for stage, values in summary.items():
+            lines.append(f"{stage:<7} " + " ".join(f"{value:>7.2f}" for value in values.values()))
+        if latency:
+            lines.append(f"{'dmx':<7} " + " ".join(f"{value:>7.2f}" for value in latency.values()))
+        lines.append(f"{frames} frames, {skipped} skipped")
+        rendered = [self.font.render(line, True, self.color) for line in lines]
+        height = self.font.get_linesize()
+        surface = pygame.Surface((max(line.get_width() for line in rendered) + 12, height * len(lines) + 12),
+                                 pygame.SRCALPHA)
+        surface.fill(self.background)
+        for number, line in enumerate(rendered):
+            surface.blit(line, (6, 6 + number * height))
+        return surface
+
+
+def glow_kernel(radius, glow=0.5, halo=0.5):
+    """Return the light of a beam of the given radius as a square float32 falloff kernel.
+
+    The core is 1 inside the radius with an antialiased edge; outside it a
+    Gaussian halo of width glow * radius starts at halo and falls off. The
+    halo is tapered to exactly 0 at the kernel's inscribed circle, since gamma
+    mapping would otherwise show the cut-off tail as a square.
+    """
+    sigma = max(glow * radius, 0.5)
+    reach = radius + 3.0 * sigma
+    extent = int(np.ceil(reach))
+    y, x = np.mgrid[-extent:extent + 1, -extent:extent + 1]
+    distance = np.hypot(x, y)
+    core = np.clip(radius + 0.5 - distance, 0.0, 1.0)
+    falloff = halo * np.exp(-0.5 * (np.maximum(distance - radius, 0.0) / sigma) ** 2)
+    falloff *= np.clip(1.0 - (distance / reach) ** 2, 0.0, 1.0) ** 2
+    return np.maximum(core, falloff).astype(np.float32)
+
+
+class GlowRenderer:
+    """Adds objects up as light in a NumPy buffer, so overlaps brighten and beams glow.
+
+    Light is accumulated in linear units at 1/downsample of the screen
+    resolution, clamped, gamma-mapped through a lookup table and added onto
+    the screen through pygame.surfarray. Kernels are premultiplied by their
+    color and cached like sprites, keyed by quantized radius and color, so a
+    frame is one slice addition per object. Halos are smooth, so the lower
+    resolution is what keeps 1080p within a 60 FPS budget on the CPU; the
+    plain pixel-doubling upscale costs a ninth of smoothscale and looks the
+    same on halos.
+    """
+
+    # Linear light levels of the gamma lookup table
+    LEVELS = 4096
+
+    def __init__(self, downsample=2, glow=0.5, halo=0.5, gamma=2.2, color_step=4, smooth=False,
+                 max_bytes=256 * 1024 * 1024):
+        self.downsample = downsample
+        self.smooth = smooth
+        self.glow = glow
+        self.halo = halo
+        self.gamma = gamma
+        self.color_step = color_step
+        self.max_bytes = max_bytes
+        self.kernels = OrderedDict()
+        self.falloffs = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        self.lut = np.round(np.linspace(0.0, 1.0, self.LEVELS) ** (1.0 / gamma) * 255).astype(np.uint8)
+        self.buffer = None
+
+    def stats(self):
+        """Return the cache counters."""
+        return {"sprites": len(self.kernels), "pixels": self.bytes // 12, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "fallbacks": 0}
+
+    def resize(self, size):
+        """Allocate the light buffer and output surfaces for a screen size."""
+        width, height = (max(1, side // self.downsample) for side in size)
+        self.buffer = np.zeros((width, height, 3), dtype=np.float32)
+        self.levels = np.empty((width, height, 3), dtype=np.uint16)
+        self.pixels = np.empty((width, height, 3), dtype=np.uint8)
+        self.small = pygame.Surface((width, height))
+        self.large = pygame.Surface(size) if self.downsample > 1 else None
+        self.size = size
+
+    def draw(self, screen, positions, radii, colors):
+        """Draw one frame of evaluated objects."""
+        if self.buffer is None or self.size != screen.get_size():
+            self.resize(screen.get_size())
+        buffer = self.buffer
+        buffer.fill(0.0)
+        width, height = buffer.shape[:2]
+
+        visible = radii >= 1
+        keys = self.keys(quantize_radius(radii[visible]), colors[visible])
+        centers = positions[visible] // self.downsample
+        with self.lock:
+            kernels = {key: self.kernel(key) for key in np.unique(keys).tolist()}
+        for (x, y), key in zip(centers.tolist(), keys.tolist()):
+            kernel = kernels[key]
+            extent = kernel.shape[0] // 2
+            left, top = max(x - extent, 0), max(y - extent, 0)
+            right, bottom = min(x + extent + 1, width), min(y + extent + 1, height)
+            if left < right and top < bottom:
+                buffer[left:right, top:bottom] += kernel[left - x + extent:right - x + extent,
+                                                         top - y + extent:bottom - y + extent]
+
+        # Clamp, then map linear light to display values
+        np.minimum(buffer, self.LEVELS - 1, out=buffer)
+        self.levels[...] = buffer
+        self.lut.take(self.levels, out=self.pixels)
+        pygame.surfarray.blit_array(self.small, self.pixels)
+        if self.large is not None:
+            upscale = pygame.transform.smoothscale if self.smooth else pygame.transform.scale
+            upscale(self.small, self.size, self.large)
+            screen.blit(self.large, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+        else:
+            screen.blit(self.small, (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+
+    def prepare(self, radii, colors):
+        """Build the kernels a frame of objects will need, one at a time so drawing is not held up."""
+        visible = radii >= 1
+        for key in np.unique(self.keys(quantize_radius(radii[visible]), colors[visible])).tolist():
+            with self.lock:
+                if key not in self.kernels:
+                    self.kernel(key)
+
+    def keys(self, quantized_radii, colors):
+        """Return the cache key of every object."""
+        step = self.color_step
+        quantized_colors = np.minimum(255, (colors + step // 2) // step * step)
+        return ((quantized_radii.astype(np.int64) << 24) | (quantized_colors[:, 0] << 16)
+                | (quantized_colors[:, 1] << 8) | quantized_colors[:, 2])
+
+    def kernel(self, key):
+        """Return the cached color-premultiplied kernel for a key, building it on a miss."""
+        kernel = self.kernels.get(key)
+        if kernel is not None:
+            self.hits += 1
+            self.kernels.move_to_end(key)
+            return kernel
+
+        self.misses += 1
+        radius = key >> 24
+        falloff = self.falloffs.get(radius)
+        if falloff is None:
+            falloff = self.falloffs[radius] = glow_kernel(radius / self.downsample, self.glow, self.halo)
+        color = np.array(((key >> 16) & 0xFF, (key >> 8) & 0xFF, key & 0xFF), dtype=np.float32)
+        light = (color / 255.0) ** self.gamma * (self.LEVELS - 1)
+        kernel = falloff[:, :, None] * light
+        self.kernels[key] = kernel
+        self.bytes += kernel.nbytes
+        while len(self.kernels) > 1 and self.bytes > self.max_bytes:
+            _, evicted = self.kernels.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+        return kernel
+
+
+def quantize_radius(radii):
+    """Snap radii above 32 px to steps of radius / 32 so nearby sizes share sprites."""
+    step = np.maximum(1, radii >> 5)
+    return (radii + step // 2) // step * step
+
+
+RENDERERS = {
+    "Sprites": lambda: SpriteRenderer(),
+    "Sprites (AA)": lambda: SpriteRenderer(antialias=True),
+    "Circles": CircleRenderer,
+    "Glow": lambda: GlowRenderer(),
+    "Glow (smooth)": lambda: GlowRenderer(smooth=True),
+}
@@ -0,0 +1,540 @@
+import base64
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from motion import ANIMATIONS
+
+SCENE_EXTENSION = ".spyLAZ"
+
+# Binary v2 container:
+#   header | metadata (UTF-8 JSON) | objects float32 (N, 11) | path ranges uint32 (N, 2) | points float32 (P, 2)
+# Blocks are little-endian and start on 16-byte boundaries so arrays can be viewed in place.
+MAGIC = b"spyLAZ\0\0"
+VERSION = 2
+HEADER = struct.Struct("<8sHHIII")  # Magic, version, flags, object count, point count, metadata length
+ALIGNMENT = 16
+OBJECT_FIELDS = ("motion", "radius", "red", "green", "blue", "center_x", "center_y",
+                 "path_radius", "angular_velocity", "speed", "animation")
+MOTIONS = {"circular": 0, "path": 1}
+NO_PATH = 0xFFFFFFFF  # Path range count of objects without a path
+PACKED_KEYS = {"motion", "radius", "color", "path_center", "path_radius", "angular_velocity", "speed",
+               "animation", "path"}
+
+# Smaller files are read into memory; mapping them would lock them against saving on Windows
+MMAP_THRESHOLD = 1024 * 1024
+
+# Folders with fewer files to decode than this are not worth starting worker processes for
+PARALLEL_THRESHOLD = 8
+
+# Largest finite float32; larger values are never shortened as float32
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+# Part of every cache entry name; bumped when entries are encoded differently, so older ones are parsed again
+CACHE_REVISION = 2
+
+
+def decode_scene(data):
+    """Decode the contents of a .spyLAZ file in either format."""
+    if bytes(data[:len(MAGIC)]) == MAGIC:
+        return decode_scene_v2(data)
+    return json.loads(base64.b64decode(data).decode("utf-8"))
+
+
+def encode_scene(scene):
+    """Encode a scene as legacy Base64 encoded JSON."""
+    return base64.b64encode(json.dumps(plain_scene(scene), indent=4).encode("utf-8"))
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+
+
+def _fits_float32(values):
+    """Return True if the numbers come back unchanged from float32; NaN would read as a missing field."""
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(over="ignore"):
+        return bool(np.all(values.astype(np.float32) == values))
+
+
+def encode_scene_v2(scene):
+    """Encode a scene in the binary v2 format."""
+    objects = scene.get("objects", [])
+    table = np.full((len(objects), len(OBJECT_FIELDS)), np.nan, dtype="<f4")
+    ranges = np.zeros((len(objects), 2), dtype="<u4")
+    ranges[:, 1] = NO_PATH
+    paths, extras = [], []
+    point_count = 0
+
+    for i, obj in enumerate(objects):
+        row = table[i]
+        # Anything the packed columns cannot hold exactly is kept in the metadata
+        extra = {key: value for key, value in obj.items() if key not in PACKED_KEYS}
+
+        if obj.get("motion") in MOTIONS:
+            row[0] = MOTIONS[obj["motion"]]
+        elif "motion" in obj:
+            extra["motion"] = obj["motion"]
+        if obj.get("animation") in ANIMATIONS:
+            row[10] = ANIMATIONS[obj["animation"]]
+        elif "animation" in obj:
+            extra["animation"] = obj["animation"]
+
+        color = obj.get("color")
+        if color is not None and len(color) == 3 and all(_is_number(c) for c in color) and _fits_float32(color):
+            row[2:5] = color
+        elif "color" in obj:
+            extra["color"] = color
+        center = obj.get("path_center")
+        if center is not None and len(center) == 2 and all(_is_number(c) for c in center) and _fits_float32(center):
+            row[5:7] = center
+        elif "path_center" in obj:
+            extra["path_center"] = center
+        for column, key in ((1, "radius"), (7, "path_radius"), (8, "angular_velocity"), (9, "speed")):
+            if _is_number(obj.get(key)) and _fits_float32(obj[key]):
+                row[column] = obj[key]
+            elif key in obj:
+                extra[key] = obj[key]
+
+        if "path" in obj:
+            try:
+                points = np.asarray(obj["path"], dtype="<f4")
+            except (TypeError, ValueError):
+                points = None
+            # Only (x, y) point lists are packed; anything else is kept as it was for the scene to reject
+            if points is None or points.ndim != 2 or points.shape[1] != 2 or not _fits_float32(obj["path"]):
+                extra["path"] = obj["path"]
+            else:
+                ranges[i] = (point_count, len(points))
+                paths.append(points)
+                point_count += len(points)
+        if extra:
+            extras.append([i, extra])
+
+    metadata = {key: value for key, value in scene.items() if key != "objects"}
+    metadata["extras"] = extras
+    metadata = json.dumps(metadata, separators=(",", ":")).encode("utf-8")
+    points = np.concatenate(paths) if paths else np.empty((0, 2), dtype="<f4")
+
+    blocks = [metadata, table.tobytes(), ranges.tobytes(), points.tobytes()]
+    out = bytearray(HEADER.pack(MAGIC, VERSION, 0, len(objects), point_count, len(metadata)))
+    for block in blocks:
+        out += bytes(_aligned(len(out)) - len(out))
+        out += block
+    return bytes(out)
+
+
+def _number(value):
+    """Return a float as int when it is integral, as JSON scenes store them."""
+    return int(value) if value.is_integer() else value
+
+
+def decode_scene_v2(data):
+    """Decode a binary v2 scene; paths are zero-copy float32 views of data."""
+    magic, version, _, object_count, point_count, metadata_length = HEADER.unpack_from(data, 0)
+    if version != VERSION:
+        raise ValueError(f"unsupported scene format version {version}")
+
+    offset = _aligned(HEADER.size)
+    metadata = json.loads(bytes(data[offset:offset + metadata_length]).decode("utf-8"))
+    offset = _aligned(offset + metadata_length)
+    table = np.frombuffer(data, dtype="<f4", count=object_count * len(OBJECT_FIELDS),
+                          offset=offset).reshape(object_count, len(OBJECT_FIELDS))
+    offset = _aligned(offset + table.nbytes)
+    ranges = np.frombuffer(data, dtype="<u4", count=object_count * 2, offset=offset).reshape(object_count, 2)
+    offset = _aligned(offset + ranges.nbytes)
+    points = np.frombuffer(data, dtype="<f4", count=point_count * 2, offset=offset).reshape(point_count, 2)
+
+    motions = {code: name for name, code in MOTIONS.items()}
+    animations = {code: name for name, code in ANIMATIONS.items()}
+    extras = {index: extra for index, extra in metadata.pop("extras", [])}
+
+    # Missing fields are stored as NaN, which is the only value not equal to itself
+    objects = []
+    for i, (row, (start, count)) in enumerate(zip(table.tolist(), ranges.tolist())):
+        motion, radius, red, green, blue, center_x, center_y, path_radius, angular_velocity, speed, animation = row
+        obj = {}
+        if motion == motion:
+            obj["motion"] = motions[int(motion)]
+        if red == red:
+            obj["color"] = [_number(red), _number(green), _number(blue)]
+        if radius == radius:
+            obj["radius"] = _number(radius)
+        if center_x == center_x:
+            obj["path_center"] = [_number(center_x), _number(center_y)]
+        if path_radius == path_radius:
+            obj["path_radius"] = _number(path_radius)
+        if angular_velocity == angular_velocity:
+            obj["angular_velocity"] = _number(angular_velocity)
+        if speed == speed:
+            obj["speed"] = _number(speed)
+        if animation == animation:
+            obj["animation"] = animations[int(animation)]
+        if count != NO_PATH:
+            obj["path"] = points[start:start + count]
+        if i in extras:
+            obj.update(extras[i])
+        objects.append(obj)
+
+    metadata["objects"] = objects
+    return metadata
+
+
+def plain_scene(scene):
+    """Return a JSON-compatible copy of a scene, e.g. for editing or legacy saving.
+
+    Floats that came out of float32 storage are printed back to their shortest
+    form, so 0.1 does not come back as 0.10000000149011612.
+    """
+    def plain(value):
+        if isinstance(value, np.ndarray):
+            return [plain(v) for v in value.tolist()]
+        if isinstance(value, (float, np.floating)):
+            value = float(value)
+            # Compare in float64: NumPy 2 would compare in float32 and shorten every value
+            if abs(value) <= FLOAT32_MAX and float(np.float32(value)) == value:
+                value = float(str(np.float32(value)))
+            # Integral floats become ints as in JSON scenes, unless beyond what a float counts exactly
+            return _number(value) if abs(value) < 2 ** 53 else value
+        if isinstance(value, np.integer):
+            return int(value)
+        if isinstance(value, dict):
+            return {key: plain(v) for key, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [plain(v) for v in value]
+        return value
+
+    return plain(scene)
+
+
+def read_scene_file(file_path):
+    """Read a scene in either format, memory-mapping large binary files."""
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size >= MMAP_THRESHOLD and file.read(len(MAGIC)) == MAGIC:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            file.seek(0)
+            data = file.read()
+    try:
+        return decode_scene(data)
+    except (ValueError, KeyError, struct.error) as e:
+        raise ValueError(f"Could not decode scene file {file_path}: {e}") from e
+
+
+def load_scene_file(file_path):
+    """Load and validate a scene from a .spyLAZ file."""
+    scene_data = read_scene_file(file_path)
+
+    # Ensure the file contains a valid scene
+    if not isinstance(scene_data, dict) or "name" not in scene_data or "objects" not in scene_data:
+        raise ValueError(f"Invalid scene format in file: {file_path}")
+    return scene_data
+
+
+def save_scene_file(file_path, scene, legacy=False):
+    """Save a scene as binary v2, or as legacy Base64 JSON."""
+    data = encode_scene(scene) if legacy else encode_scene_v2(scene)
+    # Write next to the target and swap it in, so readers never see a partial file
+    temp_path = file_path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, file_path)
+
+
+def default_cache_dir():
+    """Return the per-user folder for the parsed-scene cache."""
+    base = (os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "StageLaserProjection", "scene-cache")
+
+
+def file_digest(file_path):
+    """Return the SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SceneCache:
+    """On-disk cache of parsed and validated scenes.
+
+    Entries are binary v2 files named after the SHA-1 of the source file, so
+    cache hits load without parsing. The index maps each source path to its
+    size, mtime and hash: an unchanged size and mtime is a hit without reading
+    the file, otherwise a matching hash still avoids decoding it.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_cache_dir()
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.lock = threading.Lock()
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                self.index = json.load(file)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def entry_path(self, digest):
+        return os.path.join(self.directory, f"{digest}-{CACHE_REVISION}{SCENE_EXTENSION}")
+
+    def lookup(self, file_path, stat):
+        """Return the cached entry for an unchanged file, or None."""
+        entry = self.index.get(os.path.abspath(file_path))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            path = self.entry_path(entry["sha1"])
+            if os.path.exists(path):
+                return path
+        return None
+
+    def lookup_digest(self, file_path, stat, digest):
+        """Return the cached entry for a file whose contents are known, or None."""
+        path = self.entry_path(digest)
+        if not os.path.exists(path):
+            return None
+        self.remember(file_path, stat, digest)
+        return path
+
+    def remember(self, file_path, stat, digest):
+        with self.lock:
+            self.index[os.path.abspath(file_path)] = {
+                "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest}
+
+    def store(self, file_path, stat, digest, data):
+        """Write a parsed scene encoded as v2 and return the entry path."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.entry_path(digest)
+        if not os.path.exists(path):
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        self.remember(file_path, stat, digest)
+        return path
+
+    def save(self):
+        """Write the index and delete entries no source file refers to any more."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            self.index = {path: entry for path, entry in self.index.items() if os.path.exists(path)}
+            referenced = {os.path.basename(self.entry_path(entry["sha1"])) for entry in self.index.values()}
+            temp_path = self.index_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(self.index, file)
+            os.replace(temp_path, self.index_path)
+        for name in os.listdir(self.directory):
+            if name.endswith(SCENE_EXTENSION) and name not in referenced:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass  # Still mapped by a loaded scene on Windows
+
+
+def _parse_for_cache(file_path):
+    """Parse and validate a scene in a worker and return it encoded as v2."""
+    return encode_scene_v2(load_scene_file(file_path))
+
+
+def _cached_entry(file_path, stat, cache):
+    """Return (cached entry path or None, digest or None) for a scene file."""
+    cached = cache.lookup(file_path, stat)
+    if cached:
+        return cached, None
+    digest = file_digest(file_path)
+    return cache.lookup_digest(file_path, stat, digest), digest
+
+
+def load_cached_scene(file_path, stat, cache=None):
+    """Load one scene file, through the cache when one is given."""
+    if cache is None:
+        return load_scene_file(file_path)
+    cached, digest = _cached_entry(file_path, stat, cache)
+    if cached:
+        try:
+            return load_scene_file(cached)
+        except ValueError:
+            pass  # Damaged cache entry, decode the source again
+    data = _parse_for_cache(file_path)
+    return load_scene_file(cache.store(file_path, stat, digest or file_digest(file_path), data))
+
+
+def stat_key(stat):
+    """Return the part of a stat result that tells whether a file changed."""
+    return stat.st_size, stat.st_mtime_ns
+
+
+def scenes_by_name(index):
+    """Map scene names to scenes of a file index; later files win on duplicate names."""
+    return {scene["name"]: scene for _, scene in (index[path] for path in sorted(index)) if scene}
+
+
+def load_scene_folder(folder, cache=None, progress=None, max_workers=None):
+    """Load every .spyLAZ file in a folder, decoding changed files in parallel.
+
+    Returns the scenes by name, a list of error messages and the file index
+    (path to stat key and scene, None for files that failed) that a
+    SceneFolderWatcher can continue from. progress is called with
+    (done, total) after each file.
+    """
+    files = sorted(glob.glob(os.path.join(folder, "*" + SCENE_EXTENSION)))
+    index = {}
+    errors = []
+    pending = []
+
+    def finished(file_path, stat, scene):
+        index[file_path] = (stat_key(stat), scene)
+        if progress:
+            progress(len(index), len(files))
+
+    def failed(file_path, stat, message):
+        errors.append(message)
+        finished(file_path, stat, None)
+
+    for file_path in files:
+        # Stat before reading, so a write during loading shows up as a later change
+        try:
+            stat = os.stat(file_path)
+        except OSError as e:
+            errors.append(str(e))
+            continue
+        try:
+            cached, digest = _cached_entry(file_path, stat, cache) if cache else (None, None)
+            if cached:
+                finished(file_path, stat, load_scene_file(cached))
+                continue
+        except (OSError, ValueError):
+            cached, digest = None, None
+        pending.append((file_path, stat, digest))
+
+    if len(pending) < PARALLEL_THRESHOLD:
+        for file_path, stat, _ in pending:
+            try:
+                finished(file_path, stat, load_cached_scene(file_path, stat, cache))
+            except (OSError, ValueError) as e:
+                failed(file_path, stat, str(e))
+    else:
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = {executor.submit(_parse_for_cache, file_path): (file_path, stat, digest)
+                       for file_path, stat, digest in pending}
+            for future in as_completed(futures):
+                file_path, stat, digest = futures[future]
+                try:
+                    data = future.result()
+                    if cache:
+                        data = cache.store(file_path, stat, digest or file_digest(file_path), data)
+                        finished(file_path, stat, load_scene_file(data))
+                    else:
+                        finished(file_path, stat, decode_scene(data))
+                except (OSError, ValueError) as e:
+                    failed(file_path, stat, str(e))
+
+    if cache:
+        try:
+            cache.save()
+        except OSError as e:
+            errors.append(f"Could not save the scene cache: {e}")
+
+    return scenes_by_name(index), errors, index
+
+
+class SceneFolderWatcher(threading.Thread):
+    """Polls a scene folder and reloads only the files that were added, changed or removed.
+
+    Changes are reported from the watcher thread as on_change(removed_names,
+    changed_scenes, messages), where changed_scenes maps names to new scenes.
+    Scenes of unchanged files are never reloaded, so they keep their identity.
+    """
+
+    def __init__(self, folder, index, on_change, cache=None, interval=1.0):
+        super().__init__(daemon=True)
+        self.folder = folder
+        self.index = dict(index)
+        self.on_change = on_change
+        self.cache = cache
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+            except OSError as e:
+                self.on_change([], {}, [f"Could not scan scene folder {self.folder}: {e}"])
+
+    def poll(self):
+        """Compare the folder with the index and report what changed."""
+        stats = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.name.endswith(SCENE_EXTENSION) and entry.is_file():
+                    stats[entry.path] = entry.stat()
+
+        before = scenes_by_name(self.index)
+        messages = []
+        for file_path in set(self.index) - set(stats):
+            del self.index[file_path]
+            messages.append(f"Removed {file_path}.")
+
+        reloaded = False
+        for file_path in sorted(stats):
+            key = stat_key(stats[file_path])
+            previous = self.index.get(file_path)
+            if previous and previous[0] == key:
+                continue
+            try:
+                scene = load_cached_scene(file_path, stats[file_path], self.cache)
+            except (OSError, ValueError) as e:
+                scene = None
+                messages.append(str(e))
+            else:
+                reloaded = True
+                messages.append(f"Reloaded scene '{scene['name']}' from {file_path}.")
+            self.index[file_path] = (key, scene)
+
+        if self.cache and reloaded:
+            try:
+                self.cache.save()
+            except OSError as e:
+                messages.append(f"Could not save the scene cache: {e}")
+
+        after = scenes_by_name(self.index)
+        removed = [name for name in before if name not in after]
+        changed = {name: scene for name, scene in after.items() if before.get(name) is not scene}
+        if removed or changed or messages:
+            self.on_change(removed, changed, messages)
+
+
+def convert_files(paths, legacy=False):
+    """Rewrite .spyLAZ files, or every .spyLAZ file in folders, in one format."""
+    for path in paths:
+        files = glob.glob(os.path.join(path, "*" + SCENE_EXTENSION)) if os.path.isdir(path) else [path]
+        for file_path in files:
+            scene = plain_scene(read_scene_file(file_path))
+            save_scene_file(file_path, scene, legacy=legacy)
+            print(f"Converted {file_path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert .spyLAZ scenes between formats.")
+    parser.add_argument("paths", nargs="+", help=".spyLAZ files or folders")
+    parser.add_argument("--legacy", action="store_true", help="write Base64 JSON instead of binary v2")
+    args = parser.parse_args()
+    convert_files(args.paths, args.legacy)
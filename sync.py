@@ -0,0 +1,207 @@
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# UDP port the sync master answers on
+SYNC_PORT = 6460
+
+# Followers ask the master for its time this often, in seconds
+SYNC_INTERVAL = 0.1
+
+# Round trips kept to pick the offset from; the one with the shortest delay is the most exact
+OFFSET_WINDOW = 16
+
+# Errors above this many seconds are jumped instead of slewed, e.g. when a follower joins
+STEP_THRESHOLD = 0.25
+
+# Seconds over which a follower makes up a clock error
+SLEW_TIME = 1.0
+
+MAGIC = b"spyLzSyn"
+PING = struct.Struct("<8scId")  # Magic, b"Q", sequence, follower send time
+PONG = struct.Struct("<8scIddddd")  # Magic, b"R", sequence, follower send, master receive, master send,
+#                                     show time at master send, scene start; scene name follows as UTF-8
+
+
+def ping_packet(sequence, sent):
+    return PING.pack(MAGIC, b"Q", sequence, sent)
+
+
+def pong_packet(sequence, follower_sent, received, sent, show_time, scene_start, scene_name):
+    return (PONG.pack(MAGIC, b"R", sequence, follower_sent, received, sent, show_time, scene_start)
+            + scene_name.encode("utf-8"))
+
+
+class SyncMaster(threading.Thread):
+    """Answers followers with the show time and the scene on screen.
+
+    showing() returns (scene name, show time the scene started) or None
+    before anything is shown. Clock readings come from clock, the same
+    perf_counter() the ShowClock uses.
+    """
+
+    def __init__(self, show_clock, showing, port=SYNC_PORT, bind_address="0.0.0.0", log=print,
+                 clock=time.perf_counter):
+        super().__init__(daemon=True)
+        self.show_clock = show_clock
+        self.showing = showing
+        self.port = port
+        self.bind_address = bind_address
+        self.log = log
+        self.clock = clock
+        self.running = True
+        self.ready = threading.Event()
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.bind((self.bind_address, self.port))
+                sock.settimeout(0.5)
+                self.ready.set()
+                while self.running:
+                    try:
+                        data, addr = sock.recvfrom(64)
+                    except socket.timeout:
+                        continue
+                    received = self.clock()
+                    if len(data) != PING.size:
+                        continue
+                    magic, kind, sequence, follower_sent = PING.unpack(data)
+                    if magic != MAGIC or kind != b"Q":
+                        continue
+                    scene_name, scene_start = self.showing() or ("", 0.0)
+                    sent = self.clock()
+                    packet = pong_packet(sequence, follower_sent, received, sent, self.show_clock.time(sent),
+                                         scene_start, scene_name)
+                    sock.sendto(packet, addr)
+        except OSError as e:
+            self.log(f"Sync master error: {e}")
+        finally:
+            self.ready.set()
+
+
+class SyncFollower(threading.Thread):
+    """Keeps a ShowClock on the master's show time and follows its scene.
+
+    Every round trip gives the offset between the two machines' clocks as
+    ((t2 - t1) + (t3 - t4)) / 2, as in NTP. The offset of the round trip
+    with the shortest delay in the last OFFSET_WINDOW is used, since queuing
+    delays only ever add to it. The show clock is then slewed towards the
+    master's time, or set to it if it is more than STEP_THRESHOLD off.
+    When the master stops answering for SLEW_TIME, the clock runs on at
+    normal speed. on_scene(name, start) is called when the master shows
+    another scene.
+    """
+
+    def __init__(self, show_clock, on_scene, master=("127.0.0.1", SYNC_PORT), log=print, clock=time.perf_counter,
+                 interval=SYNC_INTERVAL):
+        super().__init__(daemon=True)
+        self.show_clock = show_clock
+        self.on_scene = on_scene
+        self.master = master
+        self.log = log
+        self.clock = clock
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.rounds = deque(maxlen=OFFSET_WINDOW)  # (delay, offset)
+        self.errors = deque(maxlen=600)  # Show clock error before each slew, jumps are only counted
+        self.lock = threading.Lock()  # stats() reads rounds and errors from the Tk thread
+        self.steps = 0
+        self.slewing = False
+        self.last_answer = None
+        self.scene = None
+        self.answered = 0
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        self.show_clock.chase(False)  # The master's time wins over timecode
+        sequence = 0
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                sock.settimeout(self.interval)
+                while not self.stopped.is_set():
+                    sequence = (sequence + 1) % 2 ** 32
+                    started = self.clock()
+                    if self.slewing and started - self.last_answer > SLEW_TIME:
+                        # The last correction is made up; do not keep running fast or slow without a master
+                        self.show_clock.slew(0)
+                        self.slewing = False
+                    try:
+                        sock.sendto(ping_packet(sequence, started), self.master)
+                        while True:
+                            data = sock.recv(PONG.size + 1024)
+                            if self.receive(data, sequence):
+                                break
+                    except socket.timeout:
+                        continue  # Lost; the next ping replaces it
+                    except OSError as e:
+                        self.log(f"Sync follower error: {e}")
+                    self.stopped.wait(max(0.0, self.interval - (self.clock() - started)))
+        except OSError as e:
+            self.log(f"Sync follower error: {e}")
+
+    def receive(self, data, sequence):
+        """Use an answer of the master; returns False for anything but the answer to the last ping."""
+        received = self.clock()
+        if len(data) < PONG.size:
+            return False
+        magic, kind, answered, sent, master_received, master_sent, show_time, scene_start = PONG.unpack_from(data)
+        if magic != MAGIC or kind != b"R" or answered != sequence:
+            return False
+        self.answered += 1
+        self.last_answer = received
+
+        delay = (received - sent) - (master_sent - master_received)
+        offset = ((master_received - sent) + (master_sent - received)) / 2
+        with self.lock:
+            self.rounds.append((delay, offset))
+        offset = min(self.rounds)[1]
+
+        # The master's show time now, on this machine's clock
+        now = self.clock()
+        target = show_time + (now + offset - master_sent)
+        error = target - self.show_clock.time(now)
+        if abs(error) > STEP_THRESHOLD:
+            self.show_clock.seek(target)
+            self.steps += 1
+            self.slewing = False
+        else:
+            with self.lock:
+                self.errors.append(error)
+            self.show_clock.slew(error, SLEW_TIME)
+            self.slewing = True
+
+        scene = (data[PONG.size:].decode("utf-8", "replace"), scene_start)
+        if scene[0] and scene != self.scene:
+            self.scene = scene
+            self.on_scene(*scene)
+        return True
+
+    def stats(self):
+        """Return offset, jitter, round-trip and clock error statistics in milliseconds."""
+        with self.lock:
+            rounds, errors = list(self.rounds), list(self.errors)
+        if not errors:
+            return {"answers": self.answered}
+        delays, offsets = np.array(rounds).T * 1000
+        errors = np.abs(np.array(errors)) * 1000
+        return {
+            "answers": self.answered,
+            "offset_ms": float(offsets[np.argmin(delays)]),
+            "jitter_ms": float(offsets.std()),
+            "round_trip_ms": float(delays.min()),
+            "error_p50_ms": float(np.percentile(errors, 50)),
+            "error_p95_ms": float(np.percentile(errors, 95)),
+            "error_max_ms": float(errors.max()),
+            "steps": self.steps,
+        }
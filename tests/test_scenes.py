@@ -0,0 +1,28 @@
+import warnings
+
+import numpy as np
+
+from scenes import decode_scene_v2, encode_scene_v2, plain_scene
+
+
+def test_plain_scene_keeps_floats_float32_cannot_hold():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        scene = plain_scene({"a": 0.123456789, "b": 1e40, "c": 3.141592653589793})
+    assert scene == {"a": 0.123456789, "b": 1e40, "c": 3.141592653589793}
+
+
+def test_plain_scene_shortens_float32_values():
+    assert plain_scene({"a": np.float32(0.1), "b": np.float32(2.0)}) == {"a": 0.1, "b": 2}
+
+
+def test_v2_keeps_paths_that_are_not_two_columns():
+    path = [[1, 2, 3], [4, 5, 6]]
+    scene = {"name": "t", "objects": [{"motion": "path", "radius": 3, "path": path}]}
+    assert decode_scene_v2(encode_scene_v2(scene))["objects"][0]["path"] == path
+
+
+def test_v2_packs_two_column_paths():
+    scene = {"name": "t", "objects": [{"motion": "path", "radius": 3, "path": [[0, 0], [10.25, 3]]}]}
+    path = decode_scene_v2(encode_scene_v2(scene))["objects"][0]["path"]
+    assert isinstance(path, np.ndarray) and path.tolist() == [[0, 0], [10.25, 3]]
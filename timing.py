@@ -0,0 +1,222 @@
+import bisect
+import csv
+import json
+import time
+
+import numpy as np
+
+# Sleep this much less than needed and spin for the rest to hit deadlines precisely
+SPIN_MARGIN = 0.001
+
+
+class FrameScheduler:
+    """Paces frames against a monotonic clock and measures the time between them.
+
+    With a target rate, frames are placed on a fixed grid. A frame that misses
+    its slot is not made up with a burst; the grid moves on and the missed
+    slots are counted as skipped. Without a target rate (vsync, or as fast as
+    possible) it only measures.
+    """
+
+    def __init__(self, target_fps=60, clock=time.perf_counter, sleep=time.sleep):
+        self.target_fps = target_fps
+        self.clock = clock
+        self.sleep = sleep
+        self.skipped = 0
+        self.last = None
+        self.deadline = None
+
+    def reset(self):
+        """Start measuring from now."""
+        self.last = self.clock()
+        self.deadline = self.last
+        self.skipped = 0
+
+    def tick(self):
+        """Wait until the next frame is due and return the seconds since the previous one."""
+        if self.last is None:
+            self.reset()
+        now = self.clock()
+
+        if self.target_fps:
+            interval = 1.0 / self.target_fps
+            self.deadline += interval
+            delay = self.deadline - now
+            if delay > 0:
+                if delay > SPIN_MARGIN:
+                    self.sleep(delay - SPIN_MARGIN)
+                while self.clock() < self.deadline:
+                    pass
+                now = self.clock()
+            elif -delay >= interval:
+                # Behind by whole frames: skip them instead of slowing the show down
+                missed = int(-delay / interval)
+                self.skipped += missed
+                self.deadline += missed * interval
+
+        dt = now - self.last
+        self.last = now
+        return dt
+
+
+# Seconds a chasing ShowClock keeps running without timecode before it stops
+FREEWHEEL = 1.0
+
+# Largest rate change a ShowClock makes to slew towards another clock
+MAX_SLEW = 0.05
+
+
+class ShowClock:
+    """Master show time in seconds that scene time is taken from.
+
+    It runs freely from a monotonic clock, or chases timecode: every
+    timecode frame re-anchors it to the received time, so it does not drift
+    and is exact again after a dropout. Between frames it runs on, for up
+    to freewheel seconds without any. slew() instead runs it slightly fast
+    or slow to catch up with another clock without a visible jump. The
+    anchor is one tuple replaced in one assignment, so any thread can read
+    the time.
+    """
+
+    def __init__(self, clock=time.perf_counter, freewheel=FREEWHEEL):
+        self.clock = clock
+        self.freewheel = freewheel
+        self.chasing = False
+        self.anchor = (clock(), 0.0, 1.0)  # Clock reading, the show time at that moment and the rate
+
+    def time(self, now=None):
+        """Return the show time at a clock reading, by default the current one."""
+        anchor_clock, anchor_time, rate = self.anchor
+        elapsed = (self.clock() if now is None else now) - anchor_clock
+        if self.chasing:
+            elapsed = min(elapsed, self.freewheel)
+        return anchor_time + elapsed * rate
+
+    def seek(self, show_time):
+        """Jump to a show time."""
+        self.anchor = (self.clock(), show_time, 1.0)
+
+    def slew(self, error, duration=1.0):
+        """Run fast or slow, within MAX_SLEW, to make up error seconds over about duration."""
+        rate = 1.0 + min(max(error / duration, -MAX_SLEW), MAX_SLEW)
+        now = self.clock()
+        self.anchor = (now, self.time(now), rate)
+
+    def timecode(self, show_time, received=None):
+        """Follow a timecode frame received at a clock reading; ignored unless chasing."""
+        if self.chasing:
+            self.anchor = (self.clock() if received is None else received, show_time, 1.0)
+
+    def chase(self, enabled):
+        """Start or stop following timecode, continuing from the current time."""
+        self.seek(self.time())
+        self.chasing = enabled
+
+
+# Parts of a rendered frame timed by FrameStats; wait is the time the frame scheduler slept
+FRAME_STAGES = ("scene", "update", "draw", "flip", "wait", "events")
+
+# Upper bin edges of the DMX latency histogram in milliseconds; a last bin holds the rest
+LATENCY_BINS = (2, 4, 8, 12, 17, 25, 33, 50, 67, 100, 200)
+
+
+class LatencyHistogram:
+    """Counts latencies in fixed bins over a whole show and keeps the latest for percentiles."""
+
+    def __init__(self, bins=LATENCY_BINS, capacity=3600):
+        self.bins = tuple(bins)
+        self.counts = [0] * (len(self.bins) + 1)
+        self.recent = np.zeros(capacity)
+        self.total = 0
+
+    def add(self, seconds):
+        """Count one latency."""
+        milliseconds = seconds * 1000
+        self.counts[bisect.bisect_left(self.bins, milliseconds)] += 1
+        self.recent[self.total % len(self.recent)] = milliseconds
+        self.total += 1
+
+    def percentiles(self, percentiles=(50, 95, 99)):
+        """Return {"p50": ms, ...} over the latest latencies, or {} before the first."""
+        recent = self.recent[:min(self.total, len(self.recent))]
+        if not len(recent):
+            return {}
+        return {f"p{p}": float(value) for p, value in zip(percentiles, np.percentile(recent, percentiles))}
+
+    def histogram(self):
+        """Return {"<2 ms": count, "2-4 ms": count, ..., ">=200 ms": count}."""
+        labels = [f"<{self.bins[0]:g} ms"]
+        labels += [f"{low:g}-{high:g} ms" for low, high in zip(self.bins, self.bins[1:])]
+        labels.append(f">={self.bins[-1]:g} ms")
+        return dict(zip(labels, self.counts))
+
+
+class FrameStats:
+    """Per-stage times of the latest frames in a fixed-size ring buffer.
+
+    The render loop calls lap(stage) after each part of a frame, adding the
+    time since the previous lap to that stage, and end_frame() once per frame.
+    Memory does not grow over a show; percentiles cover the last capacity
+    frames. latency collects the DMX receive-to-flip times of the show.
+    """
+
+    def __init__(self, capacity=3600, stages=FRAME_STAGES, clock=time.perf_counter):
+        self.stages = tuple(stages)
+        self.index = {stage: column for column, stage in enumerate(self.stages)}
+        self.clock = clock
+        self.times = np.zeros((capacity, len(self.stages)))
+        self.frames = 0
+        self.row = self.times[0]
+        self.last = None
+        self.latency = LatencyHistogram(capacity=capacity)
+
+    def start(self):
+        """Time the next lap from now."""
+        self.last = self.clock()
+
+    def lap(self, stage):
+        """Add the time since the previous lap to a stage of the current frame."""
+        now = self.clock()
+        self.row[self.index[stage]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        """Keep the current frame and start the next one, overwriting the oldest when full."""
+        self.frames += 1
+        self.row = self.times[self.frames % len(self.times)]
+        self.row.fill(0.0)
+
+    def samples(self):
+        """Return a copy of the kept frames, oldest first, in seconds."""
+        capacity = len(self.times)
+        if self.frames < capacity:
+            return self.times[:self.frames].copy()
+        start = self.frames % capacity
+        return np.concatenate((self.times[start + 1:], self.times[:start]))
+
+    def summary(self, percentiles=(50, 95, 99)):
+        """Return {stage: {"p50": ms, ...}} over the kept frames, with "frame" for the sum of stages."""
+        times = self.samples()
+        if not len(times):
+            return {}
+        columns = list(times.T) + [times.sum(axis=1)]
+        values = np.percentile(columns, percentiles, axis=1) * 1000
+        return {stage: {f"p{p}": float(value) for p, value in zip(percentiles, values[:, column])}
+                for column, stage in enumerate(self.stages + ("frame",))}
+
+    def export(self, file_path, **details):
+        """Write the kept frames to a CSV file, or frames, summary and DMX latency to JSON for any other extension."""
+        times = self.samples() * 1000
+        if file_path.lower().endswith(".csv"):
+            with open(file_path, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow([f"{stage}_ms" for stage in self.stages] + ["frame_ms"])
+                for row in times.tolist():
+                    writer.writerow([f"{value:.4f}" for value in row] + [f"{sum(row):.4f}"])
+        else:
+            latency = {"samples": self.latency.total, "summary": self.latency.percentiles(),
+                       "histogram": self.latency.histogram()}
+            data = dict(details, frames=self.frames, stages=list(self.stages), summary=self.summary(),
+                        dmx_latency=latency, times_ms=np.round(times, 4).tolist())
+            with open(file_path, "w") as file:
+                json.dump(data, file, indent=4)